@@ -2,8 +2,9 @@ from .resampler               import FractionalResampler
 from .fixedpointiirfilter     import FixedPointIIRFilter
 from .fixedpointfirfilter     import FixedPointFIRFilter
 from .filterbank              import Filterbank
+from .polyphasefir            import PolyphaseFIRFilter
 from .fixedpointcicfilter     import FixedPointCICFilter
 from .fixedpointhbfilter      import FixedPointHBFilter
 from .fixedpointfft           import FixedPointFFT
 
-__all__ = [FractionalResampler, FixedPointIIRFilter, FixedPointFIRFilter, Filterbank, FixedPointCICFilter, FixedPointHBFilter, FixedPointFFT]
+__all__ = [FractionalResampler, FixedPointIIRFilter, FixedPointFIRFilter, Filterbank, PolyphaseFIRFilter, FixedPointCICFilter, FixedPointHBFilter, FixedPointFFT]
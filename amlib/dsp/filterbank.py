@@ -22,18 +22,30 @@ class Filterbank(Elaboratable):
         self.signal_in  = Signal(signed(bitwidth))
         self.signal_out = Signal(signed(bitwidth))
 
+        # All instances of the bank share one cutoff, so they share one
+        # coefficient set: design and convert the filter once and broadcast
+        # the resulting tap table to every instance, instead of keeping
+        # `num_instances` identical copies of it around.
         if filter_structure == 'iir':
-            self.filters = [FixedPointIIRFilter(samplerate=samplerate,
-                                                bitwidth=bitwidth, fraction_width=fraction_width,
-                                                cutoff_freq=cutoff_freq, filter_order=filter_order,
-                                                filter_type=filter_type, verbose=verbose)
-                            for _ in range(num_instances)]
+            first = FixedPointIIRFilter(samplerate=samplerate,
+                                        bitwidth=bitwidth, fraction_width=fraction_width,
+                                        cutoff_freq=cutoff_freq, filter_order=filter_order,
+                                        filter_type=filter_type, verbose=verbose)
+            self.filters = [first] + \
+                           [FixedPointIIRFilter(samplerate=samplerate,
+                                                bitwidth=bitwidth, fraction_width=first.fraction_width,
+                                                coefficients_fp=[first.b, first.a], verbose=False)
+                            for _ in range(num_instances - 1)]
         elif filter_structure == 'fir':
-            self.filters = [FixedPointFIRFilter(samplerate=samplerate,
-                                                bitwidth=bitwidth, fraction_width=fraction_width,
-                                                cutoff_freq=cutoff_freq, filter_order=filter_order,
-                                                filter_type=filter_type, verbose=verbose)
-                            for _ in range(num_instances)]
+            first = FixedPointFIRFilter(samplerate=samplerate,
+                                        bitwidth=bitwidth, fraction_width=fraction_width,
+                                        cutoff_freq=cutoff_freq, filter_order=filter_order,
+                                        filter_type=filter_type, verbose=verbose)
+            self.filters = [first] + \
+                           [FixedPointFIRFilter(samplerate=samplerate,
+                                                bitwidth=bitwidth, fraction_width=first.fraction_width,
+                                                taps_fp=first.taps, verbose=False)
+                            for _ in range(num_instances - 1)]
         else:
             assert False, f"Unsupported filter structure '{filter_structure}', supported are: 'fir' and 'iir'"
 
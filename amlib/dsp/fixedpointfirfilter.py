@@ -3,12 +3,32 @@
 # Copyright (c) 2021 Hans Baier <hansfbaier@gmail.com>
 # SPDX-License-Identifier: CERN-OHL-W-2.0
 
+import math
+
 from scipy import signal
 from amaranth import *
 from pprint import pformat
 import numpy as np
 
 from ..test   import GatewareTestCase, sync_test_case
+from .tapcache import cached_taps
+
+@cached_taps
+def _compute_fir_taps(samplerate, cutoff_freq, filter_order, filter_type, weight):
+    if type(cutoff_freq) == int:
+        cutoff = cutoff_freq / samplerate
+        taps = signal.firwin(filter_order, cutoff, fs=samplerate, pass_zero=filter_type, window='hamming')
+    elif type(cutoff_freq) == tuple and len(cutoff_freq) == 2:
+        Fs = samplerate
+        Fpb = cutoff_freq[0]
+        Fsb = cutoff_freq[1]
+        bands = np.array([0., Fpb/Fs, Fsb/Fs, .5])
+        pass_zero = filter_type == True or filter_type == 'lowpass'
+        desired = [1, 0] if pass_zero else [0, 1]
+        taps = signal.remez(filter_order, bands, desired, weight=None if weight is None else list(weight))
+    else:
+        raise TypeError('cutoff_freq parameter must be int or list of start/stop band frequencies')
+    return list(taps)
 
 class FixedPointFIRFilter(Elaboratable):
     def __init__(self,
@@ -20,54 +40,68 @@ class FixedPointFIRFilter(Elaboratable):
                  filter_type:    str='lowpass',
                  weight:         list=None,
                  mac_loop:       bool=False,
+                 taps_fp:        list=None,
                  verbose:        bool=True) -> None:
 
         self.enable_in  = Signal()
         self.signal_in  = Signal(signed(bitwidth))
         self.signal_out = Signal(signed(bitwidth))
 
-        if type(cutoff_freq) == int:
-            cutoff = cutoff_freq / samplerate
-            taps = signal.firwin(filter_order, cutoff, fs=samplerate, pass_zero=filter_type, window='hamming')
-        elif type(cutoff_freq) == list and len(cutoff_freq) == 2:
-            Fs = samplerate
-            Fpb = cutoff_freq[0]
-            Fsb = cutoff_freq[1]
-            bands = np.array([0., Fpb/Fs, Fsb/Fs, .5])
-            pass_zero = filter_type == True or filter_type == 'lowpass'
-            desired = [1, 0] if pass_zero else [0, 1]
-            taps = signal.remez(filter_order, bands, desired, weight)
-        else:
-            raise TypeError('cutoff_freq parameter must be int or list of start/stop band frequencies')
-        # convert to fixed point representation
         self.bitwidth = bitwidth
         self.fraction_width = fraction_width
         assert bitwidth <= fraction_width, f"Bitwidth {bitwidth} must not exceed {fraction_width}"
+
+        if taps_fp is not None:
+            # the taps have already been designed and converted elsewhere
+            # (e.g. by a Filterbank sharing one tap table across instances)
+            self.taps = taps_fp
+            self.mac_loop = mac_loop
+            n = len(taps_fp)
+            self.symmetric = all(taps_fp[i] == taps_fp[n - 1 - i] for i in range(n // 2))
+            return
+
+        if type(cutoff_freq) == list:
+            cutoff_freq = tuple(cutoff_freq)
+        taps = _compute_fir_taps(samplerate, cutoff_freq, filter_order, filter_type,
+                                 None if weight is None else tuple(weight))
+
+        # quantize to the taps' dynamic range: the leading zero bits of the
+        # largest tap are headroom, so `bitwidth - 1 + headroom` fractional
+        # bits already use every magnitude bit a `bitwidth`-wide coefficient
+        # offers -- more would only widen the multipliers
+        max_abs = max(abs(x) for x in taps)
+        if max_abs > 0:
+            headroom = max(0, -int(math.floor(math.log2(max_abs))) - 1)
+            fraction_width = max(bitwidth, min(fraction_width, bitwidth - 1 + headroom))
+            self.fraction_width = fraction_width
+
+        # convert to fixed point representation
         self.taps = taps_fp = [int(x * 2**fraction_width) for x in taps]
 
+        # Linear-phase filters (e.g. anything firwin produces) have symmetric taps;
+        # remember that here so elaborate only spends one multiplier per tap pair.
+        n = len(taps_fp)
+        self.symmetric = all(taps_fp[i] == taps_fp[n - 1 - i] for i in range(n // 2))
+
         self.mac_loop = mac_loop
 
         if verbose:
             if type(cutoff_freq) == int:
-                print(f"{filter_order}-order windowed FIR with cutoff: {cutoff * samplerate}")
+                print(f"{filter_order}-order windowed FIR with cutoff: {cutoff_freq}")
             else:
                 print(f"{filter_order}-order FIR with start/stop band: {cutoff_freq} weight: {weight}")
             print(f"taps: {pformat(taps)}")
             print(f"taps ({bitwidth}.{fraction_width} fixed point): {taps_fp}\n")
 
-        def conversion_error(coeff, fp_coeff):
-            val = 2**(bitwidth - 1)
-            fp_product = fp_coeff * val
-            fp_result  = fp_product >> fraction_width
-            fp_error   = fp_result - (coeff * val)
-            return fp_error
-
-        num_coefficients = len(taps_fp)
-        conversion_errors = [abs(conversion_error(taps[i], taps_fp[i])) for i in range(num_coefficients)]
+        # compute all fixed point conversion errors in one vectorized sweep;
+        # NumPy's >> on int64 is an arithmetic shift, so the fixed point side
+        # is bit-exact with the hardware's two's-complement truncation
+        val = 1 << (bitwidth - 1)
+        fp_result = (np.asarray(taps_fp, dtype=np.int64) * val) >> fraction_width
+        conversion_errors = np.abs(fp_result - np.asarray(taps) * val)
         if verbose:
-            print("a, fixed point conversion errors: {}".format(conversion_errors))
-        for i in range(num_coefficients):
-            assert (conversion_errors[i] < 1.0)
+            print("a, fixed point conversion errors: {}".format(list(conversion_errors)))
+        assert np.all(conversion_errors < 1.0)
 
     def elaborate(self, platform) -> Module:
         m = Module()
@@ -76,36 +110,59 @@ class FixedPointFIRFilter(Elaboratable):
         width = self.bitwidth + self.fraction_width
         taps = Array(Const(n, signed(width)) for n in self.taps)
 
-        # we use the array indices flipped, ascending from zero
-        # so x[0] is x_n, x[1] is x_n-
-        # 1, x[2] is x_n-2 ...
-        # in other words: higher indices are past values, 0 is most recent
-        x = Array(Signal(signed(width), name=f"x{i}") for i in range(n))
-
         if self.mac_loop:
+            # The sliding-window history lives in a cyclic memory buffer: one
+            # write per sample instead of n-1 register-to-register copies, so
+            # the history costs one memory row instead of `width` flops per tap.
+            # The MAC loop walks the window through a single read port,
+            # addressing backwards from the write pointer.
+            xmem = Memory(width=width, depth=n)
+            m.submodules.xmem_write_port = xmem_wp = xmem.write_port()
+            m.submodules.xmem_read_port  = xmem_rp = xmem.read_port(transparent=True)
+
+            wptr = Signal(range(n))
+
+            m.d.comb += [
+                xmem_wp.addr.eq(wptr),
+                xmem_wp.data.eq(self.signal_in),
+                xmem_wp.en.eq(self.enable_in),
+            ]
+            with m.If(self.enable_in):
+                m.d.sync += wptr.eq(Mux(wptr == n - 1, 0, wptr + 1))
+
             ix = Signal(range(n + 1))
             madd = Signal(signed(self.bitwidth))
-            a = Signal(signed(self.bitwidth))
             b = Signal(signed(self.bitwidth))
 
+            # read address of the ix-th most recent sample: (wptr - 1 - ix) mod n;
+            # n is a compile-time constant, so the modulo is one conditional subtract
+            raw_addr  = Signal(range(2 * n))
+            read_addr = Signal(range(n))
+            m.d.comb += [
+                raw_addr.eq(wptr + (n - 1) - ix),
+                read_addr.eq(Mux(raw_addr >= n, raw_addr - n, raw_addr)),
+            ]
+
             with m.FSM(reset="IDLE"):
                 with m.State("IDLE"):
                     with m.If(self.enable_in):
+                        # the newest sample is written this very cycle; the
+                        # transparent read port forwards it straight through
+                        m.d.comb += xmem_rp.addr.eq(wptr)
                         m.d.sync += [
                             ix.eq(1),
-                            a.eq(x[0]),
                             b.eq(taps[0]),
                             madd.eq(0)
                         ]
                         m.next = "MAC"
 
                 with m.State("MAC"):
-                    m.d.sync += madd.eq(madd + ((a * b) >> self.fraction_width))
+                    m.d.sync += madd.eq(madd + ((xmem_rp.data.as_signed() * b) >> self.fraction_width))
                     with m.If(ix == n):
                         m.next = "OUTPUT"
                     with m.Else():
+                        m.d.comb += xmem_rp.addr.eq(read_addr)
                         m.d.sync += [
-                            a.eq(x[ix]),
                             b.eq(taps[ix]),
                             ix.eq(ix + 1)
                         ]
@@ -115,13 +172,53 @@ class FixedPointFIRFilter(Elaboratable):
                     m.next = "IDLE"
 
         else:
-            m.d.comb += self.signal_out.eq(
-                sum([((x[i] * taps[i]) >> self.fraction_width) for i in range(n)]))
+            # Transposed-form FIR: instead of shifting the input history and summing
+            # one long combinational adder tree, we broadcast the current sample to
+            # all taps and register the partial sums between stages. Each stage is
+            # one multiply plus one add, so the critical path no longer grows with
+            # the filter order, and each multiply/accumulate pair maps cleanly onto
+            # a DSP block with its output register.
+            x_n = Signal(signed(width))
+            acc = [Signal(signed(width + (n - 1).bit_length()), name=f"acc{i}")
+                   for i in range(n)]
+
+            # For symmetric (linear-phase) taps, taps[i] == taps[n-1-i], so the
+            # mirrored stages can share one product each: n/2 multipliers
+            # instead of n. Trivial taps get no product register at all: zero
+            # taps vanish and their stage degenerates to a wire, while taps
+            # that are an exact power of two become a bit-exact shift.
+            no_products = (n + 1) // 2 if self.symmetric else n
+            product = [None if self.taps[i] == 0 else
+                       Signal(signed(width), name=f"product{i}")
+                       for i in range(no_products)]
+
+            def tap_product(i):
+                return product[min(i, n - 1 - i)] if self.symmetric else product[i]
+
+            def product_value(i):
+                tap = self.taps[i]
+                magnitude = abs(tap)
+                if magnitude & (magnitude - 1) == 0:
+                    # negate before shifting so truncation matches the multiply
+                    shifted_in = -x_n if tap < 0 else x_n
+                    return (shifted_in << (magnitude.bit_length() - 1)) >> self.fraction_width
+                return (x_n * taps[i]) >> self.fraction_width
 
-        with m.If(self.enable_in):
-            m.d.sync += [x[i + 1].eq(x[i]) for i in range(n - 1)]
+            # Every register of the MAC pipeline -- input, product and
+            # accumulator -- shares enable_in as its clock enable, so the DSP
+            # slices retire zero toggles on idle cycles; synthesis folds the
+            # product registers into the multipliers' pipeline registers.
+            with m.If(self.enable_in):
+                m.d.sync += x_n.eq(self.signal_in)
+                m.d.sync += [product[i].eq(product_value(i))
+                             for i in range(no_products) if product[i] is not None]
+                last_product = tap_product(n - 1)
+                m.d.sync += acc[n - 1].eq(0 if last_product is None else last_product)
+                m.d.sync += [acc[i].eq(acc[i + 1] if tap_product(i) is None
+                                       else acc[i + 1] + tap_product(i))
+                             for i in range(n - 2, -1, -1)]
 
-            m.d.sync += x[0].eq(self.signal_in)
+            m.d.comb += self.signal_out.eq(acc[0])
 
         return m
 
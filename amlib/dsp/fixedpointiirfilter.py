@@ -3,12 +3,21 @@
 # Copyright (c) 2021 Hans Baier <hansfbaier@gmail.com>
 # SPDX-License-Identifier: CERN-OHL-W-2.0
 
-from math import ceil
+from math import ceil, floor, log2
 from scipy import signal
 from amaranth import *
 from pprint import pformat
+import numpy as np
 
 from ..test   import GatewareTestCase, sync_test_case
+from .tapcache import cached_taps
+
+@cached_taps
+def _compute_iir_taps(samplerate, cutoff_freq, filter_order, filter_type, allowed_ripple):
+    nyquist_frequency = samplerate * 0.5
+    cutoff = cutoff_freq / nyquist_frequency
+    b, a = signal.cheby1(filter_order, allowed_ripple, cutoff, btype=filter_type, output='ba')
+    return [list(b), list(a)]
 
 class FixedPointIIRFilter(Elaboratable):
     def __init__(self,
@@ -18,21 +27,40 @@ class FixedPointIIRFilter(Elaboratable):
                  cutoff_freq:    int=20000,
                  filter_order:   int=2,
                  filter_type:    str='lowpass',
+                 coefficients_fp: list=None,
                  verbose:        bool=False) -> None:
 
         self.enable_in  = Signal()
         self.signal_in  = Signal(signed(bitwidth))
         self.signal_out = Signal(signed(bitwidth))
 
+        self.bitwidth = bitwidth
+        self.fraction_width = fraction_width
+        assert bitwidth <= fraction_width, f"Bitwidth {bitwidth} must not exceed {fraction_width}"
+
+        if coefficients_fp is not None:
+            # the coefficients have already been designed and converted elsewhere
+            # (e.g. by a Filterbank sharing one coefficient table across instances)
+            self.b, self.a = coefficients_fp
+            assert len(self.b) == len(self.a)
+            return
+
         nyquist_frequency = samplerate * 0.5
         cutoff = cutoff_freq / nyquist_frequency
         allowed_ripple = 1.0 # dB
-        b, a = signal.cheby1(filter_order, allowed_ripple, cutoff, btype=filter_type, output='ba')
+        b, a = _compute_iir_taps(samplerate, cutoff_freq, filter_order, filter_type, allowed_ripple)
+
+        # quantize to the coefficients' dynamic range: the leading zero bits of
+        # the largest coefficient are headroom, so `bitwidth - 1 + headroom`
+        # fractional bits already use every magnitude bit a `bitwidth`-wide
+        # coefficient offers -- more would only widen the multipliers
+        max_abs = max(max(abs(x) for x in b), max(abs(x) for x in a))
+        if max_abs > 0:
+            headroom = max(0, -int(floor(log2(max_abs))) - 1)
+            fraction_width = max(bitwidth, min(fraction_width, bitwidth - 1 + headroom))
+            self.fraction_width = fraction_width
 
         # convert to fixed point representation
-        self.bitwidth = bitwidth
-        self.fraction_width = fraction_width
-        assert bitwidth <= fraction_width, f"Bitwidth {bitwidth} must not exceed {fraction_width}"
         self.b = b_fp = [int(x * 2**fraction_width) for x in b]
         self.a = a_fp = [int(x * 2**fraction_width) for x in a]
 
@@ -45,22 +73,19 @@ class FixedPointIIRFilter(Elaboratable):
             print(f"a ({bitwidth}.{fraction_width} fixed point): {a_fp}\n")
         assert len(b_fp) == len(a_fp)
 
-        def conversion_error(coeff, fp_coeff):
-            val = 2**(bitwidth - 1)
-            fp_product = fp_coeff * val
-            fp_result  = fp_product >> fraction_width
-            fp_error   = fp_result - (coeff * val)
-            return fp_error
-
-        num_coefficients = len(b)
-        conversion_errors_b = [abs(conversion_error(b[i], b_fp[i])) for i in range(num_coefficients)]
-        conversion_errors_a = [abs(conversion_error(a[i], a_fp[i])) for i in range(num_coefficients)]
+        # compute all fixed point conversion errors in one vectorized sweep;
+        # NumPy's >> on int64 is an arithmetic shift, so the fixed point side
+        # is bit-exact with the hardware's two's-complement truncation
+        val = 1 << (bitwidth - 1)
+        fp_result_b = (np.asarray(b_fp, dtype=np.int64) * val) >> fraction_width
+        fp_result_a = (np.asarray(a_fp, dtype=np.int64) * val) >> fraction_width
+        conversion_errors_b = np.abs(fp_result_b - np.asarray(b) * val)
+        conversion_errors_a = np.abs(fp_result_a - np.asarray(a) * val)
         if verbose:
-            print("b, fixed point conversion errors: {}".format(conversion_errors_a))
-            print("a, fixed point conversion errors: {}".format(conversion_errors_b))
-        for i in range(num_coefficients):
-            assert (conversion_errors_b[i] < 1.0)
-            assert (conversion_errors_a[i] < 1.0)
+            print("b, fixed point conversion errors: {}".format(list(conversion_errors_a)))
+            print("a, fixed point conversion errors: {}".format(list(conversion_errors_b)))
+        assert np.all(conversion_errors_b < 1.0)
+        assert np.all(conversion_errors_a < 1.0)
 
     def elaborate(self, platform) -> Module:
         m = Module()
@@ -69,25 +94,74 @@ class FixedPointIIRFilter(Elaboratable):
         # and https://en.wikipedia.org/wiki/Digital_filter
         # b are the input coefficients
         # a are the recursive (output) coefficients
+        # the filter design tool generates a '1.0' coefficient for a_n, which we
+        # don't need: the recursive sum below only uses self.a[1:]
         n = len(self.a)
         width = self.bitwidth + self.fraction_width
-        b = [Const(n, signed(width)) for n in self.b]
-        # the filter design tool generates a '1.0' coefficient for a_n, which we don't need
-        a = [Const(n, signed(width)) for n in self.a[1:]]
 
-        # we use the array indices flipped, ascending from zero
+        # we use the list indices flipped, ascending from zero
         # so x[0] is x_n, x[1] is x_n-1, x[2] is x_n-2 ...
-        # in other words: higher indices are past values, 0 is most recent
-        x = Array(Signal(signed(width), name=f"x{i}") for i in range(n))
-        # because y[0] would be the output value, the y array is shifted by one:
+        # in other words: higher indices are past values, 0 is most recent.
+        # Plain Python lists, not Array(): every index below is a Python
+        # constant, so the dynamic-index muxes an Array implies would be dead
+        # weight in the netlist.
+        x = [Signal(signed(width), name=f"x{i}") for i in range(n)]
+        # because y[0] would be the output value, the y list is shifted by one:
         # y[0] is y_n-1, y[1] is y_n-2, y[2] is y_n-3
         # but the signals are still named 'right' to be easy to understnad
         # in the waveform viewer
-        y = Array(Signal(signed(width), name=f"y{i+1}") for i in range(n - 1))
-
-        m.d.comb += self.signal_out.eq(
-              sum([((x[i] * b[i]) >> self.fraction_width) for i in range(n)])
-            - sum([((y[i] * a[i]) >> self.fraction_width) for i in range(n - 1)]))
+        y = [Signal(signed(width), name=f"y{i+1}") for i in range(n - 1)]
+
+        # The output feeds straight back into y[0], so the whole sum has to settle
+        # within a single cycle and cannot be pipelined. To keep the carry chains
+        # short anyway, we compress the 2n-1 partial products with a carry-save
+        # tree of 3:2 compressors; only the final two-term sum pays for a full
+        # carry propagation, instead of every intermediate addition.
+        csa_width = width + (2 * n - 1).bit_length()
+
+        # Trivial coefficients don't get a multiplier: zero coefficients drop
+        # out of the sum entirely, and exact powers of two reduce to a
+        # bit-exact arithmetic shift.
+        def product_term(value, coeff):
+            magnitude = abs(coeff)
+            if magnitude & (magnitude - 1) == 0:
+                # negate before shifting so truncation matches the multiply
+                shifted_in = -value if coeff < 0 else value
+                return (shifted_in << (magnitude.bit_length() - 1)) >> self.fraction_width
+            return (value * Const(coeff, signed(width))) >> self.fraction_width
+
+        partial_products  = [ product_term(x[i], self.b[i])     for i in range(n)     if self.b[i]     != 0]
+        partial_products += [-product_term(y[i], self.a[i + 1]) for i in range(n - 1) if self.a[i + 1] != 0]
+
+        level = []
+        for i, product in enumerate(partial_products):
+            term = Signal(signed(csa_width), name=f"pp{i}")
+            m.d.comb += term.eq(product)
+            level.append(term)
+
+        level_no = 0
+        while len(level) > 2:
+            level_no += 1
+            next_level = []
+
+            # Reduce every triple of terms to a sum/carry pair; terms that don't
+            # make up a full triple are passed down to the next level unchanged.
+            for i in range(0, len(level) - 2, 3):
+                term_a, term_b, term_c = level[i:i + 3]
+                csa_sum   = Signal(signed(csa_width), name=f"csa_s{level_no}_{i}")
+                csa_carry = Signal(signed(csa_width), name=f"csa_c{level_no}_{i}")
+                m.d.comb += [
+                    csa_sum   .eq(term_a ^ term_b ^ term_c),
+                    csa_carry .eq(((term_a & term_b) | (term_b & term_c) | (term_a & term_c)) << 1),
+                ]
+                next_level += [csa_sum, csa_carry]
+
+            leftover = len(level) % 3
+            if leftover:
+                next_level += level[-leftover:]
+            level = next_level
+
+        m.d.comb += self.signal_out.eq(sum(level))
 
         with m.If(self.enable_in):
             m.d.sync += [x[i + 1].eq(x[i]) for i in range(n - 1)]
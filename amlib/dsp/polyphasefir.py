@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2021 Hans Baier <hansfbaier@gmail.com>
+# SPDX-License-Identifier: CERN-OHL-W-2.0
+
+import math
+
+from amaranth import *
+from pprint import pformat
+
+from ..test   import GatewareTestCase, sync_test_case
+from .fixedpointfirfilter import _compute_fir_taps
+
+class PolyphaseFIRFilter(Elaboratable):
+    """Polyphase decomposition of an interpolating FIR low pass filter.
+
+        The prototype low pass is designed at the upsampled rate, but split
+        into `upsample_factor` sub-filters, one per output phase. The input
+        history advances only when a real input sample is loaded; the zero
+        stuffed samples of a conventional interpolator contribute nothing to
+        the convolution, so each output needs only the taps of its own phase.
+        This computes the same outputs as running the full prototype filter
+        on a zero-stuffed signal, with `upsample_factor` times fewer
+        multiplies.
+
+        The phase is an input rather than an internal counter, so a resampler
+        can sequence only the phases its decimator will actually keep.
+
+        I/O port:
+            I: enable_in  -- clock enable for the input history registers
+            I: load_in    -- strobe, qualified by enable_in: shift signal_in
+                             into the history
+            I: phase_in   -- selects the polyphase sub-filter driving signal_out
+            I: signal_in  -- the filter input signal
+            O: signal_out -- the filter output signal for the selected phase
+    """
+    def __init__(self,
+                 samplerate:      int,
+                 upsample_factor: int,
+                 bitwidth:        int=18,
+                 fraction_width:  int=18,
+                 cutoff_freq:     int=20000,
+                 filter_order:    int=24,
+                 filter_type:     str='lowpass',
+                 verbose:         bool=True) -> None:
+
+        self.enable_in  = Signal()
+        self.load_in    = Signal()
+        self.phase_in   = Signal(range(upsample_factor))
+        self.signal_in  = Signal(signed(bitwidth))
+        self.signal_out = Signal(signed(bitwidth))
+
+        cutoff = cutoff_freq / samplerate
+        taps = _compute_fir_taps(samplerate, cutoff_freq, filter_order, filter_type, None)
+
+        # quantize to the taps' dynamic range, as FixedPointFIRFilter does
+        max_abs = max(abs(x) for x in taps)
+        if max_abs > 0:
+            headroom = max(0, -int(math.floor(math.log2(max_abs))) - 1)
+            fraction_width = max(bitwidth, min(fraction_width, bitwidth - 1 + headroom))
+
+        # convert to fixed point representation
+        self.bitwidth = bitwidth
+        self.fraction_width = fraction_width
+        assert bitwidth <= fraction_width, f"Bitwidth {bitwidth} must not exceed {fraction_width}"
+        taps_fp = [int(x * 2**fraction_width) for x in taps]
+
+        # split the prototype into one sub-filter per phase:
+        # subtaps[p][k] = prototype[k * upsample_factor + p]
+        self.upsample_factor = upsample_factor
+        subfilter_length = (len(taps_fp) + upsample_factor - 1) // upsample_factor
+        taps_fp += [0] * (subfilter_length * upsample_factor - len(taps_fp))
+        self.subtaps = [[taps_fp[k * upsample_factor + p] for k in range(subfilter_length)]
+                        for p in range(upsample_factor)]
+
+        if verbose:
+            print(f"{filter_order}-tap polyphase FIR with {upsample_factor} phases of " +
+                  f"{subfilter_length} taps, cutoff: {cutoff * samplerate}")
+            print(f"taps ({bitwidth}.{fraction_width} fixed point): {pformat(taps_fp)}\n")
+
+    def elaborate(self, platform) -> Module:
+        m = Module()
+
+        no_phases        = self.upsample_factor
+        subfilter_length = len(self.subtaps[0])
+        width            = self.bitwidth + self.fraction_width
+
+        # for each history position, all phase variants of its tap
+        taps = [Array(Const(self.subtaps[p][k], signed(width)) for p in range(no_phases))
+                for k in range(subfilter_length)]
+
+        # input history; higher indices are past values, 0 is most recent
+        x = [Signal(signed(width), name=f"x{k}") for k in range(subfilter_length)]
+
+        m.d.comb += self.signal_out.eq(
+            sum([((x[k] * taps[k][self.phase_in]) >> self.fraction_width) for k in range(subfilter_length)]))
+
+        with m.If(self.enable_in & self.load_in):
+            m.d.sync += [x[k + 1].eq(x[k]) for k in range(subfilter_length - 1)]
+            m.d.sync += x[0].eq(self.signal_in)
+
+        return m
+
+
+class PolyphaseFIRFilterTest(GatewareTestCase):
+    FRAGMENT_UNDER_TEST = PolyphaseFIRFilter
+    FRAGMENT_ARGUMENTS = dict(samplerate=336000, upsample_factor=6)
+
+    @sync_test_case
+    def test_polyphase_fir(self):
+        dut = self.dut
+        max = int(2**15 - 1)
+        min = -max
+        for i in range(100):
+            if i % 6 == 0:
+                yield dut.signal_in.eq(max if i < 48 else min)
+                yield dut.load_in.eq(1)
+            else:
+                yield dut.load_in.eq(0)
+            yield dut.phase_in.eq(i % 6)
+            yield dut.enable_in.eq(1)
+            yield
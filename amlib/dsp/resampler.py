@@ -5,12 +5,49 @@
 
 import math
 from amaranth import *
-from amaranth.lib.fifo import SyncFIFO
 from amlib.stream import StreamInterface
 from .filterbank import Filterbank
+from .polyphasefir import PolyphaseFIRFilter
 
 from ..test   import GatewareTestCase, sync_test_case
 
+class OneEntryFIFO(Elaboratable):
+    """Single-register FIFO with a SyncFIFO-compatible read/write interface.
+
+        The resampler's filter-to-downsampler buffer never holds more than one
+        sample in flight, so a full RAM-backed FIFO wastes storage and a read
+        latency cycle; this buffer is one register and one valid flag.
+    """
+    def __init__(self, *, width):
+        self.w_data = Signal(width)
+        self.w_rdy  = Signal()
+        self.w_en   = Signal()
+
+        self.r_data = Signal(width)
+        self.r_rdy  = Signal()
+        self.r_en   = Signal()
+
+    def elaborate(self, platform) -> Module:
+        m = Module()
+
+        valid = Signal()
+
+        m.d.comb += [
+            # writable when empty, or while the current entry is being drained
+            self.w_rdy.eq(~valid | (self.r_en & valid)),
+            self.r_rdy.eq(valid),
+        ]
+
+        with m.If(self.w_en & self.w_rdy):
+            m.d.sync += [
+                self.r_data.eq(self.w_data),
+                valid.eq(1),
+            ]
+        with m.Elif(self.r_en & self.r_rdy):
+            m.d.sync += valid.eq(0)
+
+        return m
+
 class FractionalResampler(Elaboratable):
     """Fractional Resampler
         converts a signal to a different samplerate by a
@@ -59,71 +96,166 @@ class FractionalResampler(Elaboratable):
         else:
             prescale = 4 if self.prescale is None else self.prescale
 
-        m.submodules.antialiasingfilter = antialiasingfilter = \
-            Filterbank(self.filter_instances,
-                       self.input_samplerate * self.upsample_factor,
-                       bitwidth=headroom_bitwidth,
-                       filter_structure=self.filter_structure,
-                       cutoff_freq=self.filter_cutoff,
-                       filter_order=self.filter_order,
-                       verbose=self.verbose)
+        # For FIR filtering we decompose the anti-aliasing low pass into its
+        # polyphase sub-filters: the zero-stuffed samples contribute nothing to
+        # the convolution, so each upsampled output only needs the taps of its
+        # own phase, cutting multiplier activity by the upsample factor.
+        if self.filter_structure == 'fir':
+            m.submodules.antialiasingfilter = antialiasingfilter = \
+                PolyphaseFIRFilter(self.input_samplerate * self.upsample_factor,
+                                   self.upsample_factor,
+                                   bitwidth=headroom_bitwidth,
+                                   cutoff_freq=self.filter_cutoff,
+                                   filter_order=self.filter_order,
+                                   verbose=self.verbose)
+        else:
+            m.submodules.antialiasingfilter = antialiasingfilter = \
+                Filterbank(self.filter_instances,
+                           self.input_samplerate * self.upsample_factor,
+                           bitwidth=headroom_bitwidth,
+                           filter_structure=self.filter_structure,
+                           cutoff_freq=self.filter_cutoff,
+                           filter_order=self.filter_order,
+                           verbose=self.verbose)
 
         m.submodules.downsamplefifo = downsamplefifo = \
-            SyncFIFO(width=self.bitwidth, depth=self.upsample_factor)
+            OneEntryFIFO(width=self.bitwidth)
 
-        # upsampling
-        upsampled_signal  = Signal(signed(headroom_bitwidth))
-        upsample_counter  = Signal(range(self.upsample_factor))
-        input_data        = Signal(signed(self.bitwidth))
-        input_ready       = Signal()
-        input_valid       = Signal()
+        input_data  = Signal(signed(self.bitwidth))
+        input_ready = Signal()
+        input_valid = Signal()
 
         m.d.comb += [
             self.signal_in.ready.eq(input_ready),
             input_valid.eq(self.signal_in.valid),
-            input_ready.eq((upsample_counter == 0) & (downsamplefifo.w_rdy)),
             input_data.eq(self.signal_in.payload.as_signed()),
-            antialiasingfilter.signal_in.eq(upsampled_signal),
-            antialiasingfilter.enable_in.eq(upsample_counter > 0),
-            downsamplefifo.w_en.eq(downsamplefifo.w_rdy & antialiasingfilter.enable_in),
+            downsamplefifo.w_data.eq(antialiasingfilter.signal_out),
         ]
 
-        with m.If(input_valid & input_ready):
+        # with unity prescale the input multiplier is dead silicon
+        if prescale == 1:
+            prescaled_input = input_data
+        else:
+            prescaled_input = input_data * Const(prescale)
+
+        if self.filter_structure == 'fir':
+            # Upsampler, polyphase filter and decimator are fused: the filter
+            # is evaluated only for the phases the decimator keeps, never for
+            # zero-stuffed samples or discarded outputs. Between two kept
+            # outputs the upsampled index advances by downsample_factor, which
+            # consumes `loads_needed` fresh input samples and moves the tap
+            # phase by downsample_factor modulo upsample_factor.
+            loads_per_output = self.downsample_factor // self.upsample_factor
+            phase_increment  = self.downsample_factor %  self.upsample_factor
+
+            phase        = Signal(range(self.upsample_factor))
+            loads_needed = Signal(range(loads_per_output + 2), reset=1)
+            emit         = Signal()
+
+            phase_plus = Signal(range(2 * self.upsample_factor))
+            wrap       = Signal()
+
             m.d.comb += [
-                upsampled_signal.eq(input_data * Const(prescale)),
-                antialiasingfilter.enable_in.eq(1),
+                phase_plus.eq(phase + phase_increment),
+                wrap.eq(phase_plus >= self.upsample_factor),
+                antialiasingfilter.phase_in.eq(phase),
+                antialiasingfilter.signal_in.eq(prescaled_input),
+                input_ready.eq(loads_needed > 0),
             ]
-            m.d.sync += upsample_counter.eq(self.upsample_factor - 1)
-        with m.Elif(upsample_counter > 0):
-            m.d.comb += upsampled_signal.eq(0)
-            m.d.sync += upsample_counter.eq(upsample_counter - 1)
 
-        # downsampling and output
-        downsample_counter = Signal(range(self.downsample_factor))
+            with m.If(input_valid & input_ready):
+                m.d.comb += [
+                    antialiasingfilter.enable_in.eq(1),
+                    antialiasingfilter.load_in.eq(1),
+                ]
+                m.d.sync += loads_needed.eq(loads_needed - 1)
+                with m.If(loads_needed == 1):
+                    # the history for the pending output phase is now complete
+                    m.d.sync += emit.eq(1)
 
-        m.d.comb += [
-            downsamplefifo.w_data.eq(antialiasingfilter.signal_out),
-            self.signal_out.valid.eq(downsamplefifo.r_rdy),
-        ]
+            with m.If(emit & downsamplefifo.w_rdy):
+                m.d.comb += downsamplefifo.w_en.eq(1)
+                m.d.sync += phase.eq(Mux(wrap, phase_plus - self.upsample_factor, phase_plus))
+                if loads_per_output == 0:
+                    # pure upsampling: until the phase wraps, further outputs
+                    # come from the same history, one per cycle
+                    with m.If(wrap):
+                        m.d.sync += [emit.eq(0), loads_needed.eq(1)]
+                else:
+                    m.d.sync += [emit.eq(0), loads_needed.eq(loads_per_output + wrap)]
+
+            # every buffered sample is an output sample; decimation already happened
+            m.d.comb += [
+                self.signal_out.payload.eq(downsamplefifo.r_data),
+                self.signal_out.valid.eq(downsamplefifo.r_rdy),
+                downsamplefifo.r_en.eq(downsamplefifo.r_rdy & self.signal_out.ready),
+            ]
+
+        else:
+            # the IIR filter bank runs at the upsampled rate, so it is fed
+            # the classic zero-stuffed signal and decimated afterwards
+            if self.upsample_factor == 1:
+                # pure decimation: no zero stuffing, the filter simply
+                # ticks once per accepted input sample
+                m.d.comb += [
+                    input_ready.eq(downsamplefifo.w_rdy),
+                    antialiasingfilter.signal_in.eq(prescaled_input),
+                    antialiasingfilter.enable_in.eq(input_valid & input_ready),
+                    downsamplefifo.w_en.eq(antialiasingfilter.enable_in),
+                ]
+            else:
+                upsampled_signal = Signal(signed(headroom_bitwidth))
+                upsample_counter = Signal(range(self.upsample_factor))
+
+                m.d.comb += [
+                    input_ready.eq((upsample_counter == 0) & (downsamplefifo.w_rdy)),
+                    antialiasingfilter.signal_in.eq(upsampled_signal),
+                    antialiasingfilter.enable_in.eq(upsample_counter > 0),
+                    downsamplefifo.w_en.eq(downsamplefifo.w_rdy & antialiasingfilter.enable_in),
+                ]
 
-        with m.If(downsamplefifo.r_rdy & self.signal_out.ready):
-            m.d.comb += downsamplefifo.r_en.eq(1)
+                with m.If(input_valid & input_ready):
+                    m.d.comb += [
+                        upsampled_signal.eq(prescaled_input),
+                        antialiasingfilter.enable_in.eq(1),
+                    ]
+                    m.d.sync += upsample_counter.eq(self.upsample_factor - 1)
+                with m.Elif(upsample_counter > 0):
+                    m.d.comb += upsampled_signal.eq(0)
+                    m.d.sync += upsample_counter.eq(upsample_counter - 1)
 
-            with m.If(downsample_counter == 0):
-                m.d.sync += downsample_counter.eq(self.downsample_factor - 1)
+            if self.downsample_factor == 1:
+                # pure upsampling: every buffered sample is an output sample,
+                # so the whole downsample counter drops out
                 m.d.comb += [
                     self.signal_out.payload.eq(downsamplefifo.r_data),
-                    self.signal_out.valid.eq(1),
+                    self.signal_out.valid.eq(downsamplefifo.r_rdy),
+                    downsamplefifo.r_en.eq(downsamplefifo.r_rdy & self.signal_out.ready),
                 ]
-            with m.Else():
-                m.d.sync += downsample_counter.eq(downsample_counter - 1)
-                m.d.comb += self.signal_out.valid.eq(0)
+            else:
+                # downsampling and output
+                downsample_counter = Signal(range(self.downsample_factor))
 
-        with m.Else():
-            m.d.comb += [
-                downsamplefifo.r_en.eq(0),
-                self.signal_out.valid.eq(0),
-            ]
+                m.d.comb += self.signal_out.valid.eq(downsamplefifo.r_rdy)
+
+                with m.If(downsamplefifo.r_rdy & self.signal_out.ready):
+                    m.d.comb += downsamplefifo.r_en.eq(1)
+
+                    with m.If(downsample_counter == 0):
+                        m.d.sync += downsample_counter.eq(self.downsample_factor - 1)
+                        m.d.comb += [
+                            self.signal_out.payload.eq(downsamplefifo.r_data),
+                            self.signal_out.valid.eq(1),
+                        ]
+                    with m.Else():
+                        m.d.sync += downsample_counter.eq(downsample_counter - 1)
+                        m.d.comb += self.signal_out.valid.eq(0)
+
+                with m.Else():
+                    m.d.comb += [
+                        downsamplefifo.r_en.eq(0),
+                        self.signal_out.valid.eq(0),
+                    ]
 
         return m
 
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2021 Hans Baier <hansfbaier@gmail.com>
+# SPDX-License-Identifier: CERN-OHL-W-2.0
+
+""" On-disk and in-memory memoization for filter tap computation.
+
+    Designing the filter coefficients (scipy's firwin/remez/cheby1) is pure
+    Python and dominates elaboration time when the same filter is instantiated
+    many times, e.g. by Filterbank. The decorator below caches the computed
+    taps per argument tuple: once per process via lru_cache, and across
+    processes via small JSON files under ~/.cache/amlib/taps.
+"""
+
+import functools
+import hashlib
+import json
+import os
+
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "amlib", "taps")
+
+def cached_taps(compute):
+    """ Decorator that memoizes a tap-computation function.
+
+        The decorated function must take hashable arguments and return a
+        JSON-serializable result (lists of floats). Disk-cache failures are
+        silently ignored; the taps are then simply recomputed.
+    """
+    @functools.lru_cache(maxsize=None)
+    def compute_cached(*args):
+        key  = hashlib.sha1(repr((compute.__name__,) + args).encode()).hexdigest()
+        path = os.path.join(_CACHE_DIR, key + ".json")
+
+        try:
+            with open(path) as cachefile:
+                return json.load(cachefile)
+        except (OSError, ValueError):
+            pass
+
+        result = compute(*args)
+
+        try:
+            os.makedirs(_CACHE_DIR, exist_ok=True)
+            with open(path, "w") as cachefile:
+                json.dump(result, cachefile)
+        except OSError:
+            pass
+
+        return result
+
+    return functools.wraps(compute)(compute_cached)
@@ -6,16 +6,14 @@
 #   Copyright (c) 2021 Hans Baier <hansfbaier@gmail.com>
 # SPDX-License-Identifier: BSD-2-Clause
 
-import math
+import warnings
 from enum import Enum
 
 from amaranth import *
 from amaranth.build    import Platform
-from amaranth.lib.cdc  import FFSynchronizer
-from amaranth.lib.fifo import SyncFIFOBuffered
+from amaranth.lib.fifo import AsyncFIFO
 
-from ..stream import StreamInterface, connect_stream_to_fifo, connect_fifo_to_stream
-from ..utils  import rising_edge_detected, falling_edge_detected
+from ..stream import StreamInterface, connect_fifo_to_stream
 from ..test   import GatewareTestCase, sync_test_case
 
 class I2S_FORMAT(Enum):
@@ -40,8 +38,8 @@ class I2STransmitter(Elaboratable):
         underflow_out: Signal(), output
             is strobed, when the fifo was empty at the time to transmit a sample
         mismatch_out: Signal(), output
-            is strobed, when the first flag set does not match the left channel
-                        and when the first flag clear does not match the right channel
+            is strobed, when the stream's first flag does not alternate
+                        between left (set) and right (clear) samples
         fifo_level_out: Signal()
             reports the current FIFO fill level
 
@@ -57,14 +55,13 @@ class I2STransmitter(Elaboratable):
         CODEC Interface
         ---------------
 
-        The interface assumes we have a sysclk domain running around 100MHz, and that our typical
-        audio rate is 44.1kHz * 24bits * 2channels = 2.1168MHz audio clock. Thus, the architecture
-        treats the audio clock and data as asynchronous inputs that are MultiReg-syncd into the clock
-        domain. Probably the slowest sysclk rate this might work with is around 20-25MHz (10x over
-        sampling), but at 100MHz things will be quite comfortable.
-
-        The upside of the fully asynchronous implementation is that we can leave the I/O unconstrained,
-        giving the place/route more latitude to do its job.
+        The serial side is clocked directly by the I2S bit clock: a local `bitclk`
+        clock domain holds the bit counter and the state machine, and the sample
+        FIFO is an `AsyncFIFO` bridging it to the sysclk domain. Compared to
+        MultiReg-syncing the audio clock into sysclk and oversampling it, the
+        interface logic sees one event per bit slot regardless of the sysclk to
+        bit clock ratio, and no longer requires the system clock to run an order
+        of magnitude faster than the bit clock.
 
         Here's the timing format targeted by this I2S interface:
 
@@ -91,6 +88,11 @@ class I2STransmitter(Elaboratable):
         self._frame_format = frame_format
         self._fifo_depth = fifo_depth
 
+        # derived constants; computed once here rather than on every elaboration.
+        # number of bit clock slots per channel: the standard format pads
+        # each channel with one extra slot of zeros
+        self._slot_count = sample_width + 1 if frame_format == I2S_FORMAT.STANDARD else sample_width
+
         self.enable_in        = Signal()
         self.stream_in        = StreamInterface(payload_width=sample_width)
         self.word_select_in   = Signal()
@@ -104,164 +106,171 @@ class I2STransmitter(Elaboratable):
         m = Module()
         sample_width = self._sample_width
         frame_format = self._frame_format
-
-        fifo_data_width = sample_width
-        concatenate_channels = True
-        if concatenate_channels:
-            if sample_width <= 16:
-                fifo_data_width = sample_width * 2
-            else:
-                concatenate_channels = False
-                print("I2S warning: sample width greater than 16 bits. your channels can't be glued")
-
-        tx_buf_width = fifo_data_width + 1 if frame_format == I2S_FORMAT.STANDARD else fifo_data_width
-        sample_width = sample_width + 1    if frame_format == I2S_FORMAT.STANDARD else sample_width
-        offset       = [0]                 if frame_format == I2S_FORMAT.STANDARD else []
-
-        tx_cnt_width = math.ceil(math.log(fifo_data_width,2))
-        tx_cnt = Signal(tx_cnt_width)
-        tx_shifter = Signal(tx_buf_width - 1)
-        sample_msb = fifo_data_width - 1
-
-        bit_clock  = Signal()
-        word_clock = Signal()
-        m.submodules.bit_clock_synchronizer  = FFSynchronizer(self.serial_clock_in, bit_clock)
-        m.submodules.word_clock_synchronizer = FFSynchronizer(self.word_select_in, word_clock)
-
-        bit_clock_rose  = Signal()
-        bit_clock_fell  = Signal()
+        slot_count   = self._slot_count
+
+        # The serializer runs in its own clock domain, clocked directly by
+        # the I2S bit clock: the counters and the state machine advance once
+        # per bit slot. Data is launched on the falling edge from a separate
+        # negative-edge domain, and the transmit FIFO is the clock domain
+        # crossing. Deasserting enable_in holds both domains in reset.
+        m.domains += ClockDomain("bitclk", local=True)
+        m.domains += ClockDomain("bitclk_fall", clk_edge="neg", local=True)
         m.d.comb += [
-            bit_clock_rose .eq(rising_edge_detected(m, bit_clock)),
-            bit_clock_fell.eq(falling_edge_detected(m, bit_clock)),
+            ClockSignal("bitclk")     .eq(self.serial_clock_in),
+            ResetSignal("bitclk")     .eq(~self.enable_in),
+            ClockSignal("bitclk_fall") .eq(self.serial_clock_in),
+            ResetSignal("bitclk_fall") .eq(~self.enable_in),
         ]
 
+        tx_cnt = Signal(range(slot_count + 1))
+        sample_msb = sample_width - 1
+
+        # registered done flag, set on the last decrement and cleared on
+        # reload: the states below test this single bit instead of running
+        # a wide zero-compare on tx_cnt in their next-state logic
+        tx_done = Signal(reset=1)
+
+        # Instead of shifting a word buffer every bit, a down-counting index
+        # selects the output bit straight from the FIFO head: a one-bit mux
+        # tree replaces a buffer-wide register update. The index carries two
+        # spare bits: once a word is exhausted it underflows and parks past
+        # the end of the word, where bit_select pads the output with zeros --
+        # just like the zeros a shifter would shift in. It resets parked,
+        # so the line idles at zero.
+        idx_width  = (sample_width - 1).bit_length() + 2
+        tx_bit_idx = Signal(idx_width, reset=1 << (idx_width - 1))
+
+        # whether the FIFO head holds the frame currently being played;
+        # at a frame boundary the next frame is ready if it is behind the
+        # entry being retired, or, after an underflow, at the head itself
+        frame_valid      = Signal()
+        next_frame_ready = Signal()
+
+        # The far end launches the word select on the falling edge of the
+        # bit clock: capturing it right there gives the rising-edge logic
+        # below a value that is stable for the whole slot -- no
+        # synchronizers or sysclk-rate edge detectors needed.
+        left_select   = Signal()
         left_channel  = Signal()
         right_channel = Signal()
+        m.d.comb += left_select.eq(~self.word_select_in if frame_format == I2S_FORMAT.STANDARD else self.word_select_in)
+        m.d.bitclk_fall += left_channel.eq(left_select)
+        m.d.comb += right_channel.eq(~left_channel)
+
+        # reset to 'left', so that a frame start is only recognized on a
+        # real right-to-left transition of the word select
+        last_left_channel = Signal(reset=1)
+        frame_start       = Signal()
+        m.d.bitclk += last_left_channel.eq(left_channel)
+        m.d.comb   += frame_start.eq(left_channel & ~last_left_channel)
+
+        # A FIFO entry holds a whole stereo frame, the left word in the lower
+        # half and the right word in the upper half. The entry stays at the
+        # head of the FIFO while both halves are played and is popped once
+        # per frame, on the right-to-left transition, so the state machine
+        # touches the FIFO half as often and needs no per-word channel
+        # flag bookkeeping.
+        m.submodules.tx_fifo = tx_fifo = AsyncFIFO(width=2 * sample_width, depth=self._fifo_depth,
+                                                   w_domain="sync", r_domain="bitclk")
+
+        left_word  = tx_fifo.r_data[:sample_width]
+        right_word = tx_fifo.r_data[sample_width:]
+
+        # Pack the incoming stream into frames: a sample with the first flag
+        # set is the left channel and is parked in a holding register, its
+        # successor is the right channel and pushes both as one entry.
+        # first marks left channel; with whole frames in the FIFO, a channel
+        # mismatch can only happen here at the ingress, where checking it is
+        # a single compare off the state machine's critical path.
+        left_reg     = Signal(sample_width)
+        expect_first = Signal(reset=1)
         m.d.comb += [
-            left_channel.eq(~word_clock if frame_format == I2S_FORMAT.STANDARD else word_clock),
-            right_channel.eq(~left_channel)
-        ]
-
-        m.submodules.tx_fifo = tx_fifo = SyncFIFOBuffered(width=fifo_data_width + 1, depth=self._fifo_depth)
-
-        # first marks left channel
-        first_flag = Signal()
-        m.d.comb += [
-            connect_stream_to_fifo(self.stream_in, tx_fifo),
-            tx_fifo.w_data[-1].eq(self.stream_in.first),
-            first_flag.eq(tx_fifo.r_data[-1]),
+            tx_fifo.w_data.eq(Cat(left_reg, self.stream_in.payload)),
+            tx_fifo.w_en.eq(self.stream_in.valid & ~self.stream_in.first),
+            self.stream_in.ready.eq(tx_fifo.w_rdy),
             tx_fifo.r_en.eq(0),
-            self.fifo_level_out.eq(tx_fifo.level),
+            self.fifo_level_out.eq(tx_fifo.w_level),
             self.underflow_out.eq(0),
             self.mismatch_out.eq(0),
         ]
-
-        with m.FSM(reset="IDLE"):
-            with m.State("IDLE"):
-                with m.If(self.enable_in):
-                    with m.If(bit_clock_rose & left_channel):
-                        m.next = "WAIT_SYNC"
+        with m.If(self.stream_in.valid & self.stream_in.ready):
+            m.d.sync += expect_first.eq(~self.stream_in.first)
+            m.d.comb += self.mismatch_out.eq(self.stream_in.first != expect_first)
+            with m.If(self.stream_in.first):
+                m.d.sync += left_reg.eq(self.stream_in.payload)
+
+        m.d.comb += next_frame_ready.eq(Mux(frame_valid, tx_fifo.r_level > 1, tx_fifo.r_rdy))
+
+        with m.FSM(domain="bitclk", reset="WAIT_SYNC") as fsm:
+            # Amaranth numbers FSM states in the order it first sees them, so
+            # enumerate them here such that every transition of the steady
+            # state loop (WAIT_SYNC -> LEFT <-> RIGHT) flips a single state
+            # bit: the state register then toggles like a Gray counter
+            # instead of rippling through multiple bits.
+            for state in ("LEFT", "RIGHT", "WAIT_SYNC"):
+                fsm.ongoing(state)
 
             with m.State("WAIT_SYNC"):
-                with m.If(bit_clock_rose & left_channel):
-                    m.next = "LEFT_FALL"
-                    m.d.sync += [
-                        tx_cnt.eq(sample_width),
-                        tx_shifter.eq(Cat(tx_fifo.r_data, offset))
-                    ]
-                    m.d.comb += tx_fifo.r_en.eq(1),
-
-            # sync should be sampled on rising edge, but data should change on falling edge
-            with m.State("LEFT_FALL"):
-                with m.If(bit_clock_fell):
+                with m.If(frame_start):
                     m.next = "LEFT"
-
-            with m.State("LEFT"):
-                with m.If(~self.enable_in):
-                    m.next = "IDLE"
-                with m.Else():
-                    m.d.sync += [
-                        self.serial_data_out.eq(tx_shifter[sample_msb]),
-                        tx_shifter.eq(Cat(0, tx_shifter[:-1])),
-                        tx_cnt.eq(tx_cnt - 1)
+                    m.d.bitclk += [
+                        tx_cnt.eq(slot_count),
+                        tx_done.eq(0),
+                        frame_valid.eq(tx_fifo.r_rdy),
                     ]
-                    m.next = "LEFT_WAIT"
+                    with m.If(tx_fifo.r_rdy):
+                        m.d.bitclk += tx_bit_idx.eq(sample_msb)
 
-            if concatenate_channels:
-                with m.State("LEFT_WAIT"):
-                    with m.If(~self.enable_in):
-                        m.next = "IDLE"
-                    with m.Else():
-                        with m.If(bit_clock_rose):
-                            with m.If((tx_cnt == 0)):
-                                with m.If(right_channel):
-                                    m.d.sync += tx_cnt.eq(sample_width)
-                                    m.next = "RIGHT"
-                                with m.Else():
-                                    m.next = "LEFT_WAIT"
-                            with m.Elif(tx_cnt > 0):
-                                m.next = "LEFT_FALL"
-            else:
-                with m.State("LEFT_WAIT"):
-                    with m.If(~self.enable_in):
-                        m.next = "IDLE"
-                    with m.Else():
-                        with m.If(bit_clock_rose):
-                            with m.If((tx_cnt == 0)):
-                                with m.If(right_channel):
-                                    m.d.sync += tx_cnt.eq(sample_width),
-                                    with m.If(tx_fifo.r_rdy):
-                                        # in LEFT_WAIT state, we wait for the
-                                        # right channel to start
-                                        with m.If(~first_flag):
-                                            m.d.sync += tx_shifter.eq(Cat(tx_fifo.r_data, offset))
-                                            m.d.comb += tx_fifo.r_en.eq(1)
-                                        with m.Else():
-                                            m.d.comb += self.mismatch_out.eq(1)
-                                    with m.Else():
-                                        m.d.comb += self.underflow_out.eq(1)
-
-                                    m.next = "RIGHT_FALL"
-                                with m.Else():
-                                    m.next = "LEFT_WAIT"
-                            with m.Elif(tx_cnt > 0):
-                                m.next = "LEFT_FALL"
-
-            # sync should be sampled on rising edge, but data should change on falling edge
-            with m.State("RIGHT_FALL"):
-                with m.If(bit_clock_fell):
+            # One state per channel; every rising edge of the bit clock is
+            # one slot, so the states simply count slots and swap channels
+            # on the word select once a word is done.
+            with m.State("LEFT"):
+                with m.If(~tx_done):
+                    m.d.bitclk += tx_cnt.eq(tx_cnt - 1)
+                    with m.If(tx_cnt == 1):
+                        m.d.bitclk += tx_done.eq(1)
+                    with m.If(~tx_bit_idx[-1]):
+                        m.d.bitclk += tx_bit_idx.eq(tx_bit_idx - 1)
+
+                with m.Elif(right_channel):
+                    # the right word sits in the upper half of the same
+                    # FIFO entry: no FIFO access needed mid-frame
+                    m.d.bitclk += [tx_cnt.eq(slot_count), tx_done.eq(0)]
+                    with m.If(frame_valid):
+                        m.d.bitclk += tx_bit_idx.eq(sample_msb)
                     m.next = "RIGHT"
 
             with m.State("RIGHT"):
-                with m.If(~self.enable_in):
-                    m.next = "IDLE"
-                with m.Else():
-                    m.d.sync += [
-                        self.serial_data_out.eq(tx_shifter[sample_msb]),
-                        tx_shifter.eq(Cat(0, tx_shifter[:-1])),
-                        tx_cnt.eq(tx_cnt - 1)
-                    ]
-                    m.next = "RIGHT_WAIT"
-
-            with m.State("RIGHT_WAIT"):
-                with m.If(~self.enable_in):
-                    m.next = "IDLE"
-                with m.Else():
-                    with m.If(bit_clock_rose):
-                        with m.If((tx_cnt == 0) & left_channel):
-                            m.d.sync += tx_cnt.eq(sample_width)
-                            with m.If(tx_fifo.r_rdy):
-                                # in RIGHT_WAIT, we wait for the left channel to start
-                                with m.If(first_flag):
-                                    m.d.sync += tx_shifter.eq(Cat(tx_fifo.r_data, offset))
-                                    m.d.comb += tx_fifo.r_en.eq(1)
-                                with m.Else():
-                                    m.d.comb += self.mismatch_out.eq(1)
-                            with m.Else():
-                                m.d.comb += self.underflow_out.eq(1)
-                            m.next = "LEFT_FALL"
-                        with m.Elif(tx_cnt > 0):
-                            m.next = "RIGHT_FALL"
+                with m.If(~tx_done):
+                    m.d.bitclk += tx_cnt.eq(tx_cnt - 1)
+                    with m.If(tx_cnt == 1):
+                        m.d.bitclk += tx_done.eq(1)
+                    with m.If(~tx_bit_idx[-1]):
+                        m.d.bitclk += tx_bit_idx.eq(tx_bit_idx - 1)
+
+                with m.Elif(left_channel):
+                    m.d.bitclk += [tx_cnt.eq(slot_count), tx_done.eq(0)]
+                    # retire the finished frame; the FIFO reads ahead of its
+                    # consume pointer, so the following entry is at the head
+                    # in time for the next falling edge of the bit clock
+                    with m.If(frame_valid):
+                        m.d.comb += tx_fifo.r_en.eq(1)
+                    with m.If(next_frame_ready):
+                        m.d.bitclk += [
+                            frame_valid.eq(1),
+                            tx_bit_idx.eq(sample_msb),
+                        ]
+                    with m.Else():
+                        # the bit index stays parked, so the frame
+                        # is sent as zeros
+                        m.d.bitclk += frame_valid.eq(0)
+                        m.d.comb += self.underflow_out.eq(1)
+                    m.next = "LEFT"
+
+        # launch the selected bit on the falling edge of the bit clock
+        current_word = Signal(sample_width)
+        m.d.comb += current_word.eq(Mux(fsm.ongoing("RIGHT"), right_word, left_word))
+        m.d.bitclk_fall += self.serial_data_out.eq(current_word.bit_select(tx_bit_idx, 1))
 
         return m
 
@@ -295,14 +304,13 @@ class I2SReceiver(Elaboratable):
         CODEC Interface
         ---------------
 
-        The interface assumes we have a sysclk domain running around 100MHz, and that our typical
-        audio rate is 44.1kHz * 24bits * 2channels = 2.1168MHz audio clock. Thus, the architecture
-        treats the audio clock and data as asynchronous inputs that are MultiReg-syncd into the clock
-        domain. Probably the slowest sysclk rate this might work with is around 20-25MHz (10x over
-        sampling), but at 100MHz things will be quite comfortable.
-
-        The upside of the fully asynchronous implementation is that we can leave the I/O unconstrained,
-        giving the place/route more latitude to do its job.
+        The serial side is clocked directly by the I2S bit clock: a local `bitclk`
+        clock domain holds the bit counter and the state machine, and the sample
+        FIFO is an `AsyncFIFO` bridging it to the sysclk domain. Compared to
+        MultiReg-syncing the audio clock into sysclk and oversampling it, the
+        interface logic sees one event per bit slot regardless of the sysclk to
+        bit clock ratio, and no longer requires the system clock to run an order
+        of magnitude faster than the bit clock.
 
         Here's the timing format targeted by this I2S interface:
 
@@ -329,6 +337,13 @@ class I2SReceiver(Elaboratable):
         self._frame_format = frame_format
         self._fifo_depth = fifo_depth
 
+        # derived constants; computed once here rather than on every elaboration
+        self._concatenate_channels = sample_width <= 16
+        self._fifo_data_width = sample_width * 2 if self._concatenate_channels else sample_width
+        if not self._concatenate_channels:
+            warnings.warn("I2S: sample width greater than 16 bits, channels cannot be concatenated",
+                          stacklevel=2)
+
         self.enable_in        = Signal()
         self.stream_out       = StreamInterface(payload_width=sample_width)
         self.word_select_in   = Signal()
@@ -341,42 +356,60 @@ class I2SReceiver(Elaboratable):
         sample_width = self._sample_width
         frame_format = self._frame_format
 
-        fifo_data_width = sample_width
-        concatenate_channels = True
-        if concatenate_channels:
-            if sample_width <= 16:
-                fifo_data_width = sample_width * 2
-            else:
-                concatenate_channels = False
-                print("I2S warning: sample width greater than 16 bits. your channels can't be glued")
-
-        rx_cnt_width = math.ceil(math.log(fifo_data_width, 2))
-        rx_cnt = Signal(rx_cnt_width)
-
-        bit_clock  = Signal()
-        word_clock = Signal()
-        m.submodules.bit_clock_synchronizer  = FFSynchronizer(self.serial_clock_in, bit_clock)
-        m.submodules.word_clock_synchronizer = FFSynchronizer(self.word_select_in, word_clock)
+        concatenate_channels = self._concatenate_channels
+        fifo_data_width      = self._fifo_data_width
 
-        bit_clock_rose  = Signal()
-        bit_clock_fell  = Signal()
+        # The deserializer runs in its own clock domain, clocked directly by
+        # the I2S bit clock: the capture buffer and the state machine advance
+        # once per bit slot, and the receive FIFO is the clock domain
+        # crossing. The falling-edge domain only captures the word select.
+        # Deasserting enable_in holds both domains in reset.
+        m.domains += ClockDomain("bitclk", local=True)
+        m.domains += ClockDomain("bitclk_fall", clk_edge="neg", local=True)
         m.d.comb += [
-            bit_clock_rose .eq(rising_edge_detected(m, bit_clock)),
-            bit_clock_fell.eq(falling_edge_detected(m, bit_clock)),
+            ClockSignal("bitclk")      .eq(self.serial_clock_in),
+            ResetSignal("bitclk")      .eq(~self.enable_in),
+            ClockSignal("bitclk_fall") .eq(self.serial_clock_in),
+            ResetSignal("bitclk_fall") .eq(~self.enable_in),
         ]
 
-        left_channel  = Signal()
-        right_channel = Signal()
-        m.d.comb += [
-            left_channel.eq(~word_clock if frame_format == I2S_FORMAT.STANDARD else word_clock),
-            right_channel.eq(~left_channel)
-        ]
+        rx_cnt = Signal(range(sample_width + 1))
 
-        m.submodules.rx_fifo = rx_fifo = SyncFIFOBuffered(width=fifo_data_width + 1, depth=self._fifo_depth)
+        # registered done flag, set on the last decrement and cleared on
+        # reload, standing in for a wide zero-compare on rx_cnt
+        rx_done = Signal(reset=1)
 
-        rx_buf       = Signal(fifo_data_width)
-        rx_delay_cnt = Signal()
-        rx_delay_val = 1 if frame_format == I2S_FORMAT.STANDARD else 0
+        # The far end launches the word select on the falling edge of the
+        # bit clock: capturing it right there gives the rising-edge logic
+        # below a value that is stable for the whole slot -- no
+        # synchronizers or sysclk-rate edge detectors needed.
+        left_select   = Signal()
+        left_channel  = Signal()
+        right_channel = Signal()
+        m.d.comb += left_select.eq(~self.word_select_in if frame_format == I2S_FORMAT.STANDARD else self.word_select_in)
+        m.d.bitclk_fall += left_channel.eq(left_select)
+        m.d.comb += right_channel.eq(~left_channel)
+
+        # reset to 'left', so that a frame start is only recognized on a
+        # real right-to-left transition of the word select
+        last_left_channel = Signal(reset=1)
+        frame_start       = Signal()
+        m.d.bitclk += last_left_channel.eq(left_channel)
+        m.d.comb   += frame_start.eq(left_channel & ~last_left_channel)
+
+        m.submodules.rx_fifo = rx_fifo = AsyncFIFO(width=fifo_data_width + 1, depth=self._fifo_depth,
+                                                   w_domain="bitclk", r_domain="sync")
+
+        rx_buf = Signal(fifo_data_width)
+
+        # Instead of shifting the whole buffer every bit, a down-counting
+        # index steers each incoming bit into its final position: only one
+        # flop toggles per slot, driven by a write decoder, where a shifter
+        # would clock-enable the entire buffer. MSB first means the index
+        # simply counts down from the buffer's top bit -- across the whole
+        # frame when the channels are concatenated, per word otherwise.
+        rx_buf_msb = fifo_data_width - 1
+        rx_bit_idx = Signal(range(fifo_data_width), reset=rx_buf_msb)
 
         # first marks left channel, last marks right channel
         m.d.comb += [
@@ -388,113 +421,73 @@ class I2SReceiver(Elaboratable):
             self.stream_out.first.eq(~rx_fifo.r_data[-1] & self.stream_out.valid),
             self.stream_out.last.eq(rx_fifo.r_data[-1] & self.stream_out.valid),
             rx_fifo.w_en.eq(0),
-            self.fifo_level_out.eq(rx_fifo.level),
+            self.fifo_level_out.eq(rx_fifo.r_level),
         ]
 
-        with m.FSM(reset="IDLE"):
-            with m.State("IDLE"):
-                m.d.sync += rx_buf.eq(0)
-                with m.If(self.enable_in):
-                    with m.If(bit_clock_rose & left_channel):
-                        m.d.sync += rx_delay_cnt.eq(rx_delay_val)
-                        m.next = "WAIT_SYNC"
+        with m.FSM(domain="bitclk", reset="WAIT_SYNC") as fsm:
+            # Amaranth numbers FSM states in the order it first sees them, so
+            # enumerate them here such that every transition of the steady
+            # state loop (WAIT_SYNC -> LEFT <-> RIGHT) flips a single state
+            # bit: the state register then toggles like a Gray counter
+            # instead of rippling through multiple bits.
+            for state in ("LEFT", "RIGHT", "WAIT_SYNC"):
+                fsm.ongoing(state)
 
             with m.State("WAIT_SYNC"):
-                with m.If(bit_clock_rose & left_channel):
-                    with m.If(rx_delay_cnt > 0):
-                        m.d.sync += rx_delay_cnt.eq(rx_delay_cnt - 1)
-                        m.next = "WAIT_SYNC"
-                    with m.Else():
-                        m.d.sync += [
-                            rx_delay_cnt.eq(rx_delay_val),
-                            rx_cnt.eq(sample_width),
-                        ]
-                        m.next = "LEFT"
+                with m.If(frame_start):
+                    m.d.bitclk += [
+                        rx_cnt.eq(sample_width),
+                        rx_done.eq(0),
+                        rx_bit_idx.eq(rx_buf_msb),
+                    ]
+                    m.next = "LEFT"
 
+            # One state per channel; the transmitter launches each bit on
+            # the falling edge, so the word is sampled on the rising edges
+            # following the channel swap. Any padding or sync-extension
+            # slots after the word are sat out with rx_done set.
             with m.State("LEFT"):
-                with m.If(~self.enable_in):
-                    m.next = "IDLE"
-                with m.Else():
-                    m.d.sync += [
-                        rx_buf.eq(Cat(self.serial_data_in, rx_buf[:-1])),
+                with m.If(~rx_done):
+                    m.d.bitclk += [
+                        rx_buf.bit_select(rx_bit_idx, 1).eq(self.serial_data_in),
+                        rx_bit_idx.eq(rx_bit_idx - 1),
                         rx_cnt.eq(rx_cnt - 1),
                     ]
-                    m.next = "LEFT_WAIT"
-
-            if concatenate_channels:
-                with m.State("LEFT_WAIT"):
-                    with m.If(~self.enable_in):
-                        m.next = "IDLE"
-                    with m.Else():
-                        with m.If(bit_clock_rose):
-                            with m.If((rx_cnt == 0)):
-                                with m.If(right_channel):
-                                    with m.If(rx_delay_cnt == 0):
-                                        m.d.sync += [
-                                            rx_cnt.eq(sample_width),
-                                            rx_delay_cnt.eq(rx_delay_val),
-                                        ]
-                                        m.next = "RIGHT"
-                                    with m.Else():
-                                        m.d.sync += rx_delay_cnt.eq(rx_delay_cnt - 1)
-                                        m.next = "LEFT_WAIT"
-                                with m.Else():
-                                    m.next = "LEFT_WAIT"
-                            with m.Elif(rx_cnt > 0):
-                                m.next = "LEFT"
-            else:
-                with m.State("LEFT_WAIT"):
-                    with m.If(~self.enable_in):
-                        m.next = "IDLE"
-                    with m.Else():
-                        with m.If(bit_clock_rose):
-                            with m.If(rx_cnt == 0):
-                                with m.If(right_channel):
-                                    with m.If(rx_delay_cnt == 0):
-                                        # write the current data word
-                                        m.d.comb += rx_fifo.w_en.eq(1)
-                                        m.d.sync += [
-                                                rx_cnt.eq(sample_width),
-                                                rx_delay_cnt.eq(rx_delay_val),
-                                        ]
-                                        m.next = "RIGHT"
-                                    with m.Else():
-                                        m.d.sync += rx_delay_cnt.eq(rx_delay_cnt - 1)
-                                        m.next = "LEFT_WAIT"
-                                with m.Else():
-                                    m.next = "LEFT_WAIT"
-                            with m.Elif(rx_cnt > 0):
-                                m.next = "LEFT"
+                    with m.If(rx_cnt == 1):
+                        m.d.bitclk += rx_done.eq(1)
+
+                with m.Elif(right_channel):
+                    if not concatenate_channels:
+                        # write the current data word
+                        m.d.comb += rx_fifo.w_en.eq(1)
+                        # the right word reuses the buffer; with concatenated
+                        # channels the index keeps counting into the lower half
+                        m.d.bitclk += rx_bit_idx.eq(rx_buf_msb)
+                    m.d.bitclk += [
+                        rx_cnt.eq(sample_width),
+                        rx_done.eq(0),
+                    ]
+                    m.next = "RIGHT"
 
             with m.State("RIGHT"):
-                with m.If(~self.enable_in):
-                    m.next = "IDLE"
-                with m.Else():
-                    m.d.sync += [
-                        rx_buf.eq(Cat(self.serial_data_in, rx_buf[:-1])),
+                with m.If(~rx_done):
+                    m.d.bitclk += [
+                        rx_buf.bit_select(rx_bit_idx, 1).eq(self.serial_data_in),
+                        rx_bit_idx.eq(rx_bit_idx - 1),
                         rx_cnt.eq(rx_cnt - 1),
                     ]
-                    m.next = "RIGHT_WAIT"
-
-            with m.State("RIGHT_WAIT"):
-                with m.If(~self.enable_in):
-                    m.next = "IDLE"
-                with m.Else():
-                    with m.If(bit_clock_rose):
-                        with m.If((rx_cnt == 0) & left_channel):
-                            with m.If(rx_delay_cnt == 0):
-                                # write the current data word
-                                m.d.comb += rx_fifo.w_en.eq(1)
-                                m.d.sync += [
-                                    rx_cnt      .eq(sample_width),
-                                    rx_delay_cnt.eq(rx_delay_val),
-                                ]
-                                m.next = "LEFT"
-                            with m.Else():
-                                m.d.sync += rx_delay_cnt.eq(rx_delay_cnt - 1)
-                                m.next = "RIGHT_WAIT"
-                        with m.Elif(rx_cnt > 0):
-                            m.next =  "RIGHT"
+                    with m.If(rx_cnt == 1):
+                        m.d.bitclk += rx_done.eq(1)
+
+                with m.Elif(left_channel):
+                    # write the current data word
+                    m.d.comb += rx_fifo.w_en.eq(1)
+                    m.d.bitclk += [
+                        rx_cnt.eq(sample_width),
+                        rx_done.eq(0),
+                        rx_bit_idx.eq(rx_buf_msb),
+                    ]
+                    m.next = "LEFT"
 
         return m
 
@@ -534,15 +527,13 @@ class I2STransmitterTest(GatewareTestCase):
         yield dut.enable_in.eq(1)
         yield
 
-        serial_clock = 0
-        word_select  = 0
-        for i in range(2700):
-            if i % 3 == 0:
-                yield dut.serial_clock_in.eq(serial_clock)
-                serial_clock = ~serial_clock
-            if i % (3 * 64) == 0:
-                yield dut.word_select_in.eq(word_select)
-                word_select = ~word_select
+        # precompute the clock waveforms, so that the simulation hot loop
+        # is free of Python-side modulo arithmetic and branches
+        clk_levels = [(i // 3)   % 2 for i in range(2700)]
+        ws_levels  = [(i // 192) % 2 for i in range(2700)]
+        for clk, ws in zip(clk_levels, ws_levels):
+            yield dut.serial_clock_in.eq(clk)
+            yield dut.word_select_in.eq(ws)
             yield
 
 class I2SLoopbackTestHarness(Elaboratable):
@@ -27,27 +27,50 @@ seven_segment_hex_numbers = [
   ['A', 0b1110111], ['b', 0b0011111], ['C', 0b1001110], ['D', 0b1111110], ['E', 0b1001111], ['F', 0b1000111],
 ]
 
+# ROM images computed once at import time: the hex table is already in
+# nibble order, the font is spread over a depth-128 table indexed by the
+# character's ordinal, ready to feed to Memory(init=...)
+SEVEN_SEGMENT_HEX_ROM = bytes(digit[1] for digit in seven_segment_hex_numbers)
+
+def _font_rom():
+    rom = bytearray(128)
+    for char, segments in seven_segment_font:
+        if len(char) == 1:
+            rom[ord(char)] = segments
+    return bytes(rom)
+
+SEVEN_SEGMENT_FONT_ROM = _font_rom()
+
 class NibbleToSevenSegmentHex(Elaboratable):
     def __init__(self):
         self.nibble_in         = Signal(4)
         self.seven_segment_out = Signal(8)
 
+        self._rom = Memory(width=8, depth=16, init=SEVEN_SEGMENT_HEX_ROM)
+
     def elaborate(self, platform: Platform) -> Module:
         m = Module()
 
-        with m.Switch(self.nibble_in):
-            for digit in seven_segment_hex_numbers:
-                with m.Case(int(f"0x{digit[0]}", 0)):
-                    m.d.comb += self.seven_segment_out.eq(digit[1])
+        # a combinational ROM read port instead of a sixteen-arm case mux:
+        # the synthesizer maps the constant table to a LUTROM, sharing one
+        # address decode across all segment bits
+        m.submodules.rom_rd = rom_rd = self._rom.read_port(domain="comb")
+        m.d.comb += [
+            rom_rd.addr.eq(self.nibble_in),
+            self.seven_segment_out.eq(rom_rd.data),
+        ]
 
         return m
 
 class NumberToSevenSegmentHex(Elaboratable):
-    def __init__(self, width=32, register = False):
+    def __init__(self, width=32, register = False, shared = False, pipeline_stages = 1):
         # parameters
         assert width % 4 == 0, "width must be a multiple of four"
-        self.width    = width
-        self.register = register
+        assert pipeline_stages >= 1, "pipeline_stages must be at least one"
+        self.width           = width
+        self.register        = register
+        self.shared          = shared
+        self.pipeline_stages = pipeline_stages
 
         # I/O
         self.number_in         = Signal(width)
@@ -59,15 +82,51 @@ class NumberToSevenSegmentHex(Elaboratable):
 
         no_nibbles = self.width // 4
 
+        if self.shared:
+            # one decoder, time-multiplexed over the nibbles: each cycle one
+            # nibble is decoded into its output register, so the ROM is
+            # instantiated once instead of no_nibbles times. The output is
+            # registered and updates within no_nibbles cycles of the input.
+            m.submodules.digit_to_hex = digit_to_hex = NibbleToSevenSegmentHex()
+
+            idx      = Signal(range(no_nibbles))
+            segments = Array(Signal(7, name=f"segments{n}") for n in range(no_nibbles))
+
+            m.d.comb += digit_to_hex.nibble_in.eq(self.number_in.word_select(idx, 4))
+            m.d.sync += [
+                segments[idx].eq(digit_to_hex.seven_segment_out),
+                idx.eq(Mux(idx == no_nibbles - 1, 0, idx + 1)),
+            ]
+
+            for i in range(no_nibbles):
+                m.d.comb += [
+                    self.seven_segment_out[(i * 8):(i * 8 + 7)].eq(segments[i]),
+                    self.seven_segment_out[(i * 8) + 7].eq(self.dots_in[i]),
+                ]
+
+            return m
+
         for i in range(no_nibbles):
             digit_to_hex = NibbleToSevenSegmentHex()
             m.submodules += digit_to_hex
-            domain = m.d.sync if self.register else m.d.comb
-            domain += [
-                digit_to_hex.nibble_in.eq(self.number_in[(i * 4):(i * 4 + 4)]),
-                self.seven_segment_out[(i * 8):(i * 8 + 7)].eq(digit_to_hex.seven_segment_out),
-                self.seven_segment_out[(i * 8) + 7].eq(self.dots_in[i])
-            ]
+            m.d.comb += digit_to_hex.nibble_in.eq(self.number_in[(i * 4):(i * 4 + 4)])
+
+            if self.register:
+                # an explicit per-nibble register stage (or several) between
+                # the decoder and the wide output Cat, so the retimer can
+                # pull registers into the decoder LUTs instead of one sync
+                # assignment fanning the whole cone into the output
+                stage = Cat(digit_to_hex.seven_segment_out[0:7], self.dots_in[i])
+                for s in range(self.pipeline_stages):
+                    stage_reg = Signal(8, name=f"digit{i}_stage{s}")
+                    m.d.sync += stage_reg.eq(stage)
+                    stage = stage_reg
+                m.d.comb += self.seven_segment_out[(i * 8):(i * 8 + 8)].eq(stage)
+            else:
+                m.d.comb += [
+                    self.seven_segment_out[(i * 8):(i * 8 + 7)].eq(digit_to_hex.seven_segment_out),
+                    self.seven_segment_out[(i * 8) + 7].eq(self.dots_in[i])
+                ]
 
         return m
 
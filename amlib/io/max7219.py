@@ -6,9 +6,9 @@ from enum import IntEnum
 
 from amaranth import *
 from amaranth.build import Platform
-from amaranth.compat.fhdl.structure import Repl
+from amaranth.lib.fifo import SyncFIFO
 
-from .spi     import SPIControllerBus, SPIControllerInterface
+from .spi     import SPIControllerBus
 from ..test   import GatewareTestCase, sync_test_case
 from ..utils  import Timer
 
@@ -42,9 +42,6 @@ class SerialLEDArray(Elaboratable):
         self.digits_in    = Array(Signal(8, name=f"digit{n}") for n in range(8 * no_modules))
         self.valid_in     = Signal()
 
-    def send_command_to_all_modules(self, spi_controller, command_byte, data_byte):
-        return spi_controller.word_out.eq(Repl(Cat(Const(data_byte, 8), Const(command_byte, 8)), self.no_modules))
-
     def connect_to_resource(self, spi_resource):
         return [
             spi_resource.copi .eq(self.spi_bus_out.sdo),
@@ -55,94 +52,171 @@ class SerialLEDArray(Elaboratable):
     def elaborate(self, platform: Platform) -> Module:
         m = Module()
 
-        current_digits = Array(Signal(8, name=f"current_digit{n}") for n in range(8 * self.no_modules))
-
         m.submodules.init_delay = init_delay = \
             Timer(width=24, load=int(self.init_delay), reload=0, allow_restart=False)
 
-        m.submodules.spi_controller = spi_controller = SPIControllerInterface(word_size=16 * self.no_modules, divisor=self.divisor, cs_idles_high=True)
-
-        with m.If(self.valid_in):
-            m.d.sync += Cat(current_digits).eq(Cat(self.digits_in))
+        # One fixed 16-bit shift register, shared by all chained modules:
+        # the words of one refresh step are shifted through the chain as a
+        # single continuous burst, instead of widening the shift register
+        # with the chain length. The burst engine below reloads the shift
+        # register at word boundaries without pausing the clock, so every
+        # latch window carries exactly 16 * no_modules rising edges -- the
+        # MAX7219 shifts on every edge regardless of the load line, so any
+        # extra edge inside a window would corrupt the chain.
+        half_period = self.divisor // 2
+        phase       = Signal(range(half_period), reset=half_period - 1)
+        sck         = Signal()
+        load_n      = Signal(reset=1)
+        shift       = Signal(16)
+        bit_counter = Signal(range(16), reset=15)
+        burst_active = Signal()
 
         m.d.comb += [
-            spi_controller.spi.connect(self.spi_bus_out),
-            init_delay.start.eq(1),
+            self.spi_bus_out.sck.eq(sck),
+            self.spi_bus_out.sdo.eq(shift[15]),
+            self.spi_bus_out.cs.eq(load_n),
         ]
 
-        digit_counter = Signal(8)
-        next_digit    = Signal()
-
-        with m.If(next_digit):
-            m.d.sync += digit_counter.eq(digit_counter + 1)
-
-        step_counter = Signal(range(10))
-        next_step    = Signal()
-
-        with m.If(next_step):
-            m.d.sync += step_counter.eq(step_counter + 1)
+        # The digits live in a small RAM addressed by (module, digit) rather
+        # than a register file behind a wide dynamic Array mux: the display
+        # path becomes a single synchronous read that synthesis can map to
+        # distributed RAM. A strobe on valid_in copies digits_in into the
+        # RAM one entry per cycle; a refresh that overlaps the copy may mix
+        # old and new digits for one frame, which a display doesn't show.
+        digit_mem = Memory(width=8, depth=8 * self.no_modules)
+        m.submodules.digit_rd = digit_rd = digit_mem.read_port(domain="sync")
+        m.submodules.digit_wr = digit_wr = digit_mem.write_port()
+
+        copy_active  = Signal()
+        copy_counter = Signal(range(8 * self.no_modules))
+        m.d.comb += [
+            digit_wr.addr.eq(copy_counter),
+            digit_wr.data.eq(self.digits_in[copy_counter]),
+            digit_wr.en.eq(copy_active),
+        ]
+        with m.If(copy_active):
+            m.d.sync += copy_counter.eq(copy_counter + 1)
+            with m.If(copy_counter == 8 * self.no_modules - 1):
+                m.d.sync += copy_active.eq(0)
+        with m.Elif(self.valid_in):
+            m.d.sync += [copy_active.eq(1), copy_counter.eq(0)]
+
+        # the first word shifted out travels to the end of the chain,
+        # so modules are served in descending order
+        module_counter = Signal(range(self.no_modules), reset=self.no_modules - 1)
+        last_module    = module_counter == 0
+
+        digit_counter = Signal(3)
+        m.d.comb += digit_rd.addr.eq(Cat(digit_counter, module_counter))
+
+        # the init sequence lives in a ROM addressed by the step counter,
+        # instead of an unrolled case ladder of constant loads
+        init_rom = Memory(width=16, depth=len(self.init_sequence),
+                          init=[(int(command) << 8) | int(data) for command, data in self.init_sequence])
+        m.submodules.init_rd = init_rd = init_rom.read_port(domain="comb")
+
+        step_counter = Signal(range(len(self.init_sequence)))
+        m.d.comb += init_rd.addr.eq(step_counter)
+
+        # The words of one step are staged into a small FIFO and drained as
+        # one gap-free burst: the shift register reloads straight from the
+        # FIFO at each word boundary, on the same falling edge that would
+        # otherwise shift, so the clock never pauses mid-burst. Each burst
+        # still ends with its own latch -- every MAX7219 register write
+        # needs one -- so a burst spans the chain, not the whole refresh.
+        m.submodules.tx_fifo = tx_fifo = SyncFIFO(width=16, depth=self.no_modules)
+        m.d.comb += tx_fifo.w_data.eq(Cat(digit_rd.data, digit_counter + 1))
+
+        fill_valid = Signal()
+        in_init    = Signal(reset=1)
 
         with m.FSM(name="max7219"):
             with m.State("WAIT"):
+                # the timer is a one-shot: only strobe it while we actually
+                # wait on it, so it sits idle for the rest of the runtime
+                m.d.comb += init_delay.start.eq(1)
                 with m.If(init_delay.done):
-                    m.next = "INIT"
-
-            with m.State("INIT"):
-                with m.Switch(step_counter):
-                    with m.Case(0):
-                        item = self.init_sequence[0]
-                        m.d.sync += self.send_command_to_all_modules(spi_controller, item[0], item[1]),
-                        m.d.comb += next_step.eq(1)
-                    with m.Case(1):
-                        m.d.comb += [
-                            spi_controller.start_transfer.eq(1),
-                            next_step.eq(1)
-                        ]
-
-                    i = 1
-                    for item in self.init_sequence[1:]:
-                        with m.Case(2 * i):
-                            with m.If(spi_controller.word_complete):
-                                m.d.sync += self.send_command_to_all_modules(spi_controller, item[0], item[1]),
-                                m.d.comb += next_step.eq(1)
-                        with m.Case(2 * i + 1):
-                            m.d.comb += [
-                                spi_controller.start_transfer.eq(1),
-                                next_step.eq(1)
+                    m.next = "INIT_FILL"
+
+            with m.State("INIT_FILL"):
+                # the same (command, data) word goes to every module
+                m.d.comb += [
+                    tx_fifo.w_data.eq(init_rd.data),
+                    tx_fifo.w_en.eq(1),
+                ]
+                with m.If(last_module):
+                    m.d.sync += module_counter.eq(self.no_modules - 1)
+                    m.next = "DRAIN"
+                with m.Else():
+                    m.d.sync += module_counter.eq(module_counter - 1)
+
+            with m.State("SHOWTIME_FILL"):
+                # stage this row's word for every module; the RAM registers
+                # the read address, so the write enable trails the module
+                # counter by one cycle
+                m.d.comb += tx_fifo.w_en.eq(fill_valid)
+                with m.If(fill_valid & (module_counter == self.no_modules - 1)):
+                    m.d.sync += fill_valid.eq(0)
+                    m.next = "DRAIN"
+                with m.Else():
+                    m.d.sync += [
+                        fill_valid.eq(1),
+                        module_counter.eq(module_counter - 1),
+                    ]
+
+            with m.State("DRAIN"):
+                with m.If(~burst_active):
+                    # start of burst: fetch the first word, drop the load line
+                    m.d.comb += tx_fifo.r_en.eq(1)
+                    m.d.sync += [
+                        shift.eq(tx_fifo.r_data),
+                        bit_counter.eq(15),
+                        phase.eq(half_period - 1),
+                        load_n.eq(0),
+                        burst_active.eq(1),
+                    ]
+                with m.Elif(phase == 0):
+                    m.d.sync += phase.eq(half_period - 1)
+                    with m.If(~sck):
+                        m.d.sync += sck.eq(1)
+                    with m.Else():
+                        m.d.sync += sck.eq(0)
+                        with m.If(bit_counter != 0):
+                            m.d.sync += [
+                                shift.eq(shift << 1),
+                                bit_counter.eq(bit_counter - 1),
                             ]
-                        i += 1
-
-                    with m.Case(2 * i):
-                        with m.If(spi_controller.word_complete):
-                            m.d.comb += next_step.eq(1)
-
-                    with m.Default():
-                        m.d.sync += step_counter.eq(0)
-                        m.next = "SHOWTIME"
-
-            with m.State('SHOWTIME'):
-                with m.Switch(step_counter):
-                    with m.Case(0):
-                        for module in range(self.no_modules):
+                        with m.Elif(tx_fifo.r_rdy):
+                            # next word continues the burst without a gap
+                            m.d.comb += tx_fifo.r_en.eq(1)
                             m.d.sync += [
-                                spi_controller.word_out[(0 + module * 16):(8  + module * 16)].eq(current_digits[Const(module * 8, 8) + digit_counter]),
-                                spi_controller.word_out[(8 + module * 16):(16 + module * 16)].eq((digit_counter + 1)[0:8]),
+                                shift.eq(tx_fifo.r_data),
+                                bit_counter.eq(15),
                             ]
-                            m.d.comb += next_step.eq(1)
-
-                    with m.Case(1):
-                        m.d.comb += [
-                            spi_controller.start_transfer.eq(1),
-                            next_step.eq(1)
-                        ]
-
-                    with m.Default():
-                        with m.If(spi_controller.word_complete):
-                            m.d.sync += step_counter.eq(0)
-                            with m.If(digit_counter >= 7):
-                                m.d.sync += digit_counter.eq(0)
+                        with m.Else():
+                            # burst done: raising the load line latches
+                            # all 16 * no_modules bits into the chain
+                            m.d.sync += [
+                                load_n.eq(1),
+                                burst_active.eq(0),
+                            ]
+                            with m.If(~in_init):
+                                m.d.sync += digit_counter.eq(digit_counter + 1)
+                            with m.Elif(step_counter < len(self.init_sequence) - 1):
+                                m.d.sync += step_counter.eq(step_counter + 1)
                             with m.Else():
-                                m.d.comb += next_digit.eq(1)
+                                m.d.sync += in_init.eq(0)
+                            m.next = "LATCH"
+                with m.Else():
+                    m.d.sync += phase.eq(phase - 1)
+
+            with m.State("LATCH"):
+                # the load line is already high again; the fill state takes
+                # several cycles, which gives the latch pulse its width
+                with m.If(in_init):
+                    m.next = "INIT_FILL"
+                with m.Else():
+                    m.next = "SHOWTIME_FILL"
 
         return m
 
@@ -151,22 +225,58 @@ class SerialLEDArrayTest(GatewareTestCase):
     FRAGMENT_UNDER_TEST = SerialLEDArray
     FRAGMENT_ARGUMENTS = dict(divisor=10, init_delay=20, no_modules=2)
 
-    def loopback(self, no_cycles):
-        for _ in range(no_cycles):
-            yield self.dut.spi_bus_out.sdi.eq((yield self.dut.spi_bus_out.sdo))
-            yield
+    @staticmethod
+    def to_words(bits):
+        return [int("".join(str(b) for b in bits[i:i + 16]), 2)
+                for i in range(0, len(bits), 16)]
 
     @sync_test_case
     def test_spi_interface(self):
         dut = self.dut
         yield
         yield
-        yield from self.loopback(900)
-        yield
-        yield
         for d in range(16):
             yield dut.digits_in[d].eq(d)
         yield
-        yield
         yield from self.pulse(dut.valid_in)
-        yield from self.loopback(7200)
+
+        # record every latch window: the number of rising clock edges
+        # while the load line is low, and the bit sampled on each one
+        windows  = []
+        edges    = 0
+        bits     = []
+        prev_cs  = 1
+        prev_sck = 0
+        for _ in range(9000):
+            cs  = yield dut.spi_bus_out.cs
+            sck = yield dut.spi_bus_out.sck
+            sdo = yield dut.spi_bus_out.sdo
+            if not cs and sck and not prev_sck:
+                edges += 1
+                bits.append(sdo)
+            if cs and not prev_cs:
+                windows.append((edges, bits))
+                edges = 0
+                bits  = []
+            prev_cs  = cs
+            prev_sck = sck
+            yield
+
+        no_init = len(default_init_sequence)
+        self.assertGreaterEqual(len(windows), no_init + 8)
+
+        # the MAX7219 shifts on every clock edge regardless of the load
+        # line, so each window must carry exactly 16 bits per module
+        for edge_count, _ in windows:
+            self.assertEqual(edge_count, 32)
+
+        # init: the same word goes to every module in the chain
+        for (_, window_bits), (command, data) in zip(windows, default_init_sequence):
+            word = (int(command) << 8) | int(data)
+            self.assertEqual(self.to_words(window_bits), [word, word])
+
+        # showtime: one digit row per window, the far module's word first
+        for row, (_, window_bits) in enumerate(windows[no_init:]):
+            d = row % 8
+            self.assertEqual(self.to_words(window_bits),
+                             [((d + 1) << 8) | (d + 8), ((d + 1) << 8) | d])
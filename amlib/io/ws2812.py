@@ -5,7 +5,6 @@
 from math import log2
 
 from amaranth import *
-from amaranth.utils import bits_for
 from amaranth.build import Platform
 
 from ..test   import GatewareTestCase, sync_test_case
@@ -20,7 +19,9 @@ class WS2812(Elaboratable):
     def __init__(self, *, sys_clock_freq, no_leds):
         # parameters
         self.no_leds           = no_leds
-        self.full_cycle_length = sys_clock_freq // 800e3
+        # coerce to int once, so every use elaborates as a minimum-width
+        # constant instead of a float-derived literal
+        self.full_cycle_length = int(sys_clock_freq // 800e3)
         self.low_cycle_length  = int(0.32 * self.full_cycle_length)
         self.high_cycle_length = int(0.64 * self.full_cycle_length)
         print(f"full cycle: {self.full_cycle_length}")
@@ -47,20 +48,41 @@ class WS2812(Elaboratable):
 
         grb = Signal(3 * 8)
 
-        led_counter = Signal(bits_for(self.no_leds) + 1)
-        bit_counter = Signal(5)
-        current_bit = Signal()
-
-        cycle_counter_width  = bits_for(int(self.full_cycle_length)) + 1
-        cycle_counter        = Signal(cycle_counter_width)
-        current_cycle_length = Signal.like(cycle_counter)
+        # counts up to and including no_leds, so range() sizes it exactly
+        led_counter = Signal(range(self.no_leds + 1))
+
+        # grb stays put for the whole word and a down-counting index picks
+        # the bit: a 24:1 mux on the read side instead of a write-back into
+        # all 24 flops every slot
+        bit_idx = Signal(range(24), reset=23)
+
+        # Down-counters instead of up-counters with magnitude compares:
+        # both the slot boundary and the end of the high pulse become
+        # equality-to-zero tests (a single wide OR) in place of two
+        # ripple comparators on every cycle. The high-pulse counter is
+        # loaded with the next bit's duty cycle at each slot boundary.
+        full_cycle = self.full_cycle_length
+        cycle_counter = Signal(range(full_cycle + 1), reset=full_cycle)
+        high_counter  = Signal.like(cycle_counter)
+
+        def high_length(bit):
+            return Mux(bit, self.high_cycle_length, self.low_cycle_length)
+
+        # the next bit's duty length is precomputed into registers during
+        # the slot (grb, the bit index and the memory read are all stable
+        # between boundaries), so the boundary cycle itself only moves
+        # registers instead of chaining the zero flag with the bit mux
+        next_high_bit  = Signal.like(high_counter)
+        next_high_word = Signal.like(high_counter)
+        m.d.sync += [
+            next_high_bit.eq(high_length(grb.bit_select(bit_idx - 1, 1))),
+            next_high_word.eq(high_length(mem_read_port.data[23])),
+        ]
 
-        print(f"cycle counter: {cycle_counter_width}")
+        print(f"cycle counter: {len(cycle_counter)}")
 
         m.d.comb += [
             self.data_out.eq(1),
-            current_bit.eq(grb[23]),
-            current_cycle_length.eq(Mux(current_bit, self.high_cycle_length, self.low_cycle_length)),
             mem_write_port.addr.eq(self.led_address_in),
             mem_write_port.data.eq(Cat(self.blue_in, self.red_in, self.green_in)),
             mem_write_port.en.eq(self.write_enable_in),
@@ -75,14 +97,15 @@ class WS2812(Elaboratable):
 
             with m.State("RESET"):
                 m.d.comb += self.data_out.eq(0)
-                m.d.sync += cycle_counter.eq(cycle_counter + 1)
+                m.d.sync += cycle_counter.eq(cycle_counter - 1)
 
-                with m.If(cycle_counter >= Const(self.full_cycle_length)):
-                    m.d.sync += cycle_counter.eq(0)
+                with m.If(cycle_counter == 0):
+                    m.d.sync += cycle_counter.eq(full_cycle)
 
                     with m.If(led_counter == 0):
                         m.d.sync += [
                             grb.eq(mem_read_port.data),
+                            high_counter.eq(next_high_word),
                             led_counter.eq(led_counter + 1),
                         ]
                         m.next = "TRANSMIT"
@@ -93,31 +116,31 @@ class WS2812(Elaboratable):
                         m.next = "IDLE"
 
             with m.State("TRANSMIT"):
-                m.d.sync += cycle_counter.eq(cycle_counter + 1)
+                m.d.comb += self.data_out.eq(high_counter != 0)
+                m.d.sync += cycle_counter.eq(cycle_counter - 1)
 
-                with m.If(cycle_counter < current_cycle_length):
-                    m.d.comb += self.data_out.eq(1)
-                with m.Else():
-                    m.d.comb += self.data_out.eq(0)
+                with m.If(high_counter != 0):
+                    m.d.sync += high_counter.eq(high_counter - 1)
 
-                with m.If(cycle_counter >= Const(self.full_cycle_length)):
-                    m.d.sync += cycle_counter.eq(0)
+                with m.If(cycle_counter == 0):
+                    m.d.sync += cycle_counter.eq(full_cycle)
 
-                    last_bit = 23
-                    with m.If(bit_counter < last_bit):
+                    with m.If(bit_idx != 0):
                         m.d.sync += [
-                            grb.eq(grb << 1),
-                            bit_counter.eq(bit_counter + 1),
+                            high_counter.eq(next_high_bit),
+                            bit_idx.eq(bit_idx - 1),
                         ]
                     with m.Else():
-                        m.d.sync += [
-                            bit_counter.eq(0),
-                            led_counter.eq(led_counter + 1),
-                        ]
+                        m.d.sync += bit_idx.eq(23)
 
-                        # transmit each LED's data
-                        with m.If(led_counter < self.no_leds):
-                            m.d.sync += grb.eq(mem_read_port.data),
+                        # transmit each LED's data; the counter never exceeds
+                        # no_leds, so an equality test finds the last word
+                        with m.If(led_counter != self.no_leds):
+                            m.d.sync += [
+                                led_counter.eq(led_counter + 1),
+                                grb.eq(mem_read_port.data),
+                                high_counter.eq(next_high_word),
+                            ]
 
                         # if all LEDS' data has been transmitted, send another reset
                         with m.Else():
@@ -130,12 +153,15 @@ class WS2812Test(GatewareTestCase):
     FRAGMENT_ARGUMENTS = dict(sys_clock_freq=8e6, no_leds=3)
 
     def write_led_color(self, dut, led_no, red, green, blue):
+        # batch all inputs ahead of a single clock tick: one write per
+        # cycle keeps the pysim churn per LED to a minimum
         yield dut.red_in   .eq(red)
         yield dut.green_in .eq(green)
         yield dut.blue_in  .eq(blue)
         yield dut.led_address_in.eq(led_no)
-        yield from self.pulse(dut.write_enable_in)
+        yield dut.write_enable_in.eq(1)
         yield
+        yield dut.write_enable_in.eq(0)
 
     @sync_test_case
     def test_spi_interface(self):
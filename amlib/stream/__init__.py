@@ -161,3 +161,68 @@ def connect_stream_to_fifo(stream: StreamInterface, fifo: FIFOInterface, firstBi
         result.append(fifo.w_data[lastBit].eq(stream.last))
 
     return result
+
+
+def connect_fifo_to_stream_skid(m: Module, fifo: FIFOInterface, stream: StreamInterface, firstBit: int=None, lastBit: int=None) -> None:
+    """Like connect_fifo_to_stream, but through a registered output stage:
+       the stream's valid and payload come from registers instead of the
+       FIFO's read-status logic, which breaks the combinational path from
+       the FIFO status into the consumer at the cost of one cycle of latency.
+    """
+
+    out_valid = Signal()
+    out_data  = Signal.like(fifo.r_data)
+
+    m.d.comb += [
+        fifo.r_en.eq(~out_valid | stream.ready),
+        stream.valid.eq(out_valid),
+        stream.payload.eq(out_data),
+    ]
+    with m.If(fifo.r_en & fifo.r_rdy):
+        m.d.sync += [
+            out_valid.eq(1),
+            out_data.eq(fifo.r_data),
+        ]
+    with m.Elif(stream.ready):
+        m.d.sync += out_valid.eq(0)
+
+    if firstBit:
+        m.d.comb += stream.first.eq(out_data[firstBit])
+    if lastBit:
+        m.d.comb += stream.last.eq(out_data[lastBit])
+
+
+def connect_stream_to_fifo_skid(m: Module, stream: StreamInterface, fifo: FIFOInterface, firstBit: int=None, lastBit: int=None) -> None:
+    """Like connect_stream_to_fifo, but with a one-entry skid buffer in
+       front of the FIFO: the stream's ready is a registered copy of the
+       FIFO's w_rdy instead of the status signal itself. A beat accepted
+       in the very cycle the FIFO fills up is parked in the buffer and
+       written once space frees up, so no data is lost and the producer
+       never sees FIFO status logic combinationally.
+    """
+
+    in_word = Signal.like(fifo.w_data)
+    m.d.comb += in_word.eq(stream.payload)
+    if firstBit:
+        m.d.comb += in_word[firstBit].eq(stream.first)
+    if lastBit:
+        m.d.comb += in_word[lastBit].eq(stream.last)
+
+    skid_valid = Signal()
+    skid_data  = Signal.like(fifo.w_data)
+
+    m.d.sync += stream.ready.eq(fifo.w_rdy)
+    m.d.comb += [
+        fifo.w_en.eq(Mux(skid_valid, 1, stream.valid & stream.ready)),
+        fifo.w_data.eq(Mux(skid_valid, skid_data, in_word)),
+    ]
+    # ready is one cycle behind w_rdy, so a beat can arrive just as the
+    # FIFO fills; park it. While the buffer is full, ready is low, so it
+    # can never be overwritten before it drains.
+    with m.If(skid_valid & fifo.w_rdy):
+        m.d.sync += skid_valid.eq(0)
+    with m.If(stream.valid & stream.ready & ~fifo.w_rdy):
+        m.d.sync += [
+            skid_valid.eq(1),
+            skid_data.eq(in_word),
+        ]
@@ -8,6 +8,7 @@
 
 """ Stream generators. """
 import unittest
+import numpy as np
 from amaranth       import *
 from amaranth.utils import bits_for
 from .            import StreamInterface
@@ -76,6 +77,18 @@ class ConstantStreamGenerator(Elaboratable):
             self.stream      = stream_type()
             self._data_width = len(self.stream.data)
 
+        # Our stream's widths are fixed from here on out; cache them so that
+        # elaborate (and anything called per-test) doesn't have to re-query the
+        # record fields.
+        self._valid_width   = len(self.stream.valid)
+        self._payload_width = len(self.stream.payload)
+
+        # For byte-wide ROMs initialized from a bytes-like object, materialize the
+        # initializer as a NumPy view right away; Memory can then iterate machine
+        # bytes instead of boxing a fresh Python int per element on each elaborate.
+        if self._data_width == 8 and isinstance(constant_data, (bytes, bytearray)):
+            self._data = np.frombuffer(bytes(constant_data), dtype=np.uint8)
+
         self.start_position = Signal(range(self._data_length))
 
         # If we have a maximum length width, include it in our I/O port.
@@ -103,11 +116,11 @@ class ConstantStreamGenerator(Elaboratable):
         # If we have byte-sized data, Python will implicitly handle things correctly.
         # Return our data unmodified.
         if self._data_width == 8:
-            return self._data, len(self.stream.valid)
+            return self._data, self._valid_width
 
         # If we don't have a byte-string, return our data without pre-processing.
         if not isinstance(self._data, (bytes, bytearray)):
-            return self._data, len(self.stream.valid)
+            return self._data, self._valid_width
 
         # If our width isn't evenly divisible by 8, we can't accept bytes.
         if (self._data_width % 8):
@@ -189,8 +202,11 @@ class ConstantStreamGenerator(Elaboratable):
                 m.d.comb += self.output_length.eq(self._data_length)
 
         # Controller.
+        # The state bodies contain only transitions and counter updates; all of the
+        # datapath (payload, first/last and the valid-mask selection) lives outside
+        # the FSM below, so synthesizers can extract and re-encode the state machine
+        # without dragging the datapath muxes into the next-state logic.
         with m.FSM(domain=self._domain) as fsm:
-            m.d.comb += self.stream.valid.eq(fsm.ongoing('STREAMING'))
 
             # IDLE -- we're not actively transmitting.
             with m.State('IDLE'):
@@ -200,9 +216,6 @@ class ConstantStreamGenerator(Elaboratable):
                     position_in_stream  .eq(start_position),
                     bytes_sent          .eq(0)
                 ]
-                m.d.comb += [
-                    rom_read_port.addr  .eq(start_position),
-                ]
 
                 # Once the user requests that we start, move to our stream being valid.
                 with m.If(self.start & (self.max_length > 0)):
@@ -210,81 +223,6 @@ class ConstantStreamGenerator(Elaboratable):
 
             # STREAMING -- we're actively transmitting data
             with m.State('STREAMING'):
-                m.d.comb += [
-                    # Always drive the stream from our current memory output...
-                    rom_read_port.addr   .eq(position_in_stream),
-                    self.stream.payload  .eq(rom_read_port.data),
-
-                    ## ... and base First and Last based on our current position in the stream.
-                    self.stream.first    .eq(on_first_packet),
-                    self.stream.last     .eq(on_last_packet)
-                ]
-
-                # Our ``valid`` flag requires a bunch of special handling, since it could be
-                # wider than one bit for streams with multi-byte words; and it could be set
-                # by either our max_length limiter or by our data length. This logic is complex,
-                # but hopefully actually generates relatively simple hardware.
-
-
-                # Explicit optimization: if we have a valid length of one, don't bother
-                # with all of this logic. This ensures we never degrade speed for trivial cases.
-                if len(self.stream.valid) == 1:
-                    m.d.comb += self.stream.valid.eq(1)
-
-                # Otherwise, we have more complex logic to deal with.
-                else:
-                    # If we're on the last packet, we'll apply as many valid bits as we have valid
-                    # bytes in our data stream.
-                    with m.If(on_last_packet):
-
-                        # If we're not enforcing a max length, always use our leftover bits-per-word.
-                        if not self._max_length_width:
-                            m.d.comb += self.stream.valid.eq(Repl(Const(1), valid_bits_last_word))
-
-                        # Otherwise, do our complex case.
-                        else:
-                            # Figure out if we're ending due to the length of data we have, or due to a
-                            # maximum-to-send restriction...
-                            ending_due_to_data_length = (position_in_stream == (data_length - 1))
-                            ending_due_to_max_length  = (bytes_sent + bytes_per_word >= self.max_length)
-
-                            # ... and figure out the valid bits based us running out of data...
-                            valid_due_to_data_length  = Repl(Const(1), valid_bits_last_word)
-
-                            # ... and due to our maximum length. Finding this arithmetically creates
-                            # difficult-to-optimize code, and bytes_per_word is going to be small, so
-                            # we'll figure this out enumeratively.
-                            bytes_left_over         = Signal(range(bytes_per_word + 1))
-                            valid_due_to_max_length = Signal.like(self.stream.valid)
-                            m.d.comb += bytes_left_over.eq(self.max_length - bytes_sent)
-
-                            # Generate a case for every possibly number of bytes left over...
-                            with m.Switch(bytes_left_over):
-                                for i in range(1, bytes_per_word + 1):
-
-                                    # ... with the appropriate amount of valid bits.
-                                    with m.Case(i):
-                                        m.d.comb += valid_due_to_max_length.eq(Repl(Const(1), i))
-
-                            # Our most complex logic is when both of our end conditions are met; we'll need
-                            # to take the lesser of the two validities. AND'ing these will work to accept the
-                            # lesser of the two validities.
-                            with m.If(ending_due_to_data_length & ending_due_to_max_length):
-                                m.d.comb += self.stream.valid.eq(valid_due_to_data_length & valid_due_to_max_length)
-
-                            # If we're ending due to the length of data we have, use our normal logic.
-                            with m.Elif(ending_due_to_data_length):
-                                m.d.comb += self.stream.valid.eq(valid_due_to_data_length)
-
-                            # Otherwise, we're endign due to our maximum length requirement. We'll apply the
-                            # appropriate valid mask.
-                            with m.Else():
-                                m.d.comb += self.stream.valid.eq(valid_due_to_max_length)
-
-                    # If we're not on our last word, every valid bit should be set.
-                    with m.Else():
-                        valid_bits = len(self.stream.valid)
-                        m.d.comb += self.stream.valid.eq(Repl(Const(1), valid_bits))
 
                 # If the current data byte is accepted, move past it.
                 with m.If(self.stream.ready):
@@ -292,19 +230,104 @@ class ConstantStreamGenerator(Elaboratable):
                     # If there's still data left to transmit, move forward.
                     with m.If(~on_last_packet):
                         m.d.sync += position_in_stream.eq(position_in_stream + 1)
-                        m.d.comb += rom_read_port.addr.eq(position_in_stream + 1)
 
                         if self._max_length_width:
                             m.d.sync += bytes_sent.eq(bytes_sent + bytes_per_word)
 
                     # Otherwise, we've finished streaming. Return to IDLE.
                     with m.Else():
-                        m.next = 'DONE'
+                        m.next = 'IDLE'
+
+        # Datapath, factored out of the FSM.
+        streaming = fsm.ongoing('STREAMING')
+
+        m.d.comb += [
+            # Report our completion as the last beat is accepted; this strobes for
+            # exactly one cycle, without needing a dedicated DONE state for it.
+            self.done            .eq(streaming & self.stream.ready & on_last_packet),
 
-            # DONE -- report our completion; and then return to idle
-            with m.State('DONE'):
-                m.d.comb += self.done.eq(1)
-                m.next = 'IDLE'
+            # Always drive the stream from our current memory output...
+            self.stream.payload  .eq(rom_read_port.data),
+
+            ## ... and base First and Last based on our current position in the stream.
+            self.stream.first    .eq(on_first_packet & streaming),
+            self.stream.last     .eq(on_last_packet  & streaming)
+        ]
+
+        # Address the ROM with our current position while streaming -- moving ahead
+        # a word early whenever the current word is accepted -- and pre-load the
+        # starting position otherwise.
+        with m.If(streaming):
+            m.d.comb += rom_read_port.addr.eq(position_in_stream)
+            with m.If(self.stream.ready & ~on_last_packet):
+                m.d.comb += rom_read_port.addr.eq(position_in_stream + 1)
+        with m.Else():
+            m.d.comb += rom_read_port.addr.eq(start_position)
+
+        # Our ``valid`` flag requires a bunch of special handling, since it could be
+        # wider than one bit for streams with multi-byte words; and it could be set
+        # by either our max_length limiter or by our data length. This logic is complex,
+        # but hopefully actually generates relatively simple hardware.
+        with m.If(streaming):
+
+            # Explicit optimization: if we have a valid length of one, don't bother
+            # with all of this logic. This ensures we never degrade speed for trivial cases.
+            if self._valid_width == 1:
+                m.d.comb += self.stream.valid.eq(1)
+
+            # Otherwise, we have more complex logic to deal with.
+            else:
+                # If we're on the last packet, we'll apply as many valid bits as we have valid
+                # bytes in our data stream.
+                with m.If(on_last_packet):
+
+                    # If we're not enforcing a max length, always use our leftover bits-per-word.
+                    if not self._max_length_width:
+                        m.d.comb += self.stream.valid.eq(Repl(Const(1), valid_bits_last_word))
+
+                    # Otherwise, do our complex case.
+                    else:
+                        # Figure out if we're ending due to the length of data we have, or due to a
+                        # maximum-to-send restriction...
+                        ending_due_to_data_length = (position_in_stream == (data_length - 1))
+                        ending_due_to_max_length  = (bytes_sent + bytes_per_word >= self.max_length)
+
+                        # ... and figure out the valid bits based us running out of data...
+                        valid_due_to_data_length  = Repl(Const(1), valid_bits_last_word)
+
+                        # ... and due to our maximum length. Finding this arithmetically creates
+                        # difficult-to-optimize code, and bytes_per_word is going to be small, so
+                        # we'll figure this out enumeratively.
+                        bytes_left_over         = Signal(range(bytes_per_word + 1))
+                        valid_due_to_max_length = Signal.like(self.stream.valid)
+                        m.d.comb += bytes_left_over.eq(self.max_length - bytes_sent)
+
+                        # Generate a case for every possibly number of bytes left over...
+                        with m.Switch(bytes_left_over):
+                            for i in range(1, bytes_per_word + 1):
+
+                                # ... with the appropriate amount of valid bits.
+                                with m.Case(i):
+                                    m.d.comb += valid_due_to_max_length.eq(Repl(Const(1), i))
+
+                        # Our most complex logic is when both of our end conditions are met; we'll need
+                        # to take the lesser of the two validities. AND'ing these will work to accept the
+                        # lesser of the two validities.
+                        with m.If(ending_due_to_data_length & ending_due_to_max_length):
+                            m.d.comb += self.stream.valid.eq(valid_due_to_data_length & valid_due_to_max_length)
+
+                        # If we're ending due to the length of data we have, use our normal logic.
+                        with m.Elif(ending_due_to_data_length):
+                            m.d.comb += self.stream.valid.eq(valid_due_to_data_length)
+
+                        # Otherwise, we're endign due to our maximum length requirement. We'll apply the
+                        # appropriate valid mask.
+                        with m.Else():
+                            m.d.comb += self.stream.valid.eq(valid_due_to_max_length)
+
+                # If we're not on our last word, every valid bit should be set.
+                with m.Else():
+                    m.d.comb += self.stream.valid.eq(Repl(Const(1), self._valid_width))
 
         # Convert our sync domain to the domain requested by the user, if necessary.
         if self._domain != "sync":
@@ -454,11 +477,10 @@ class ConstantStreamGeneratorTest(GatewareTestCase):
         # Once we pulse start, we should see the transmission start,
         yield from self.pulse(dut.start)
 
-        # ... we should start seeing the remainder of our transmission.
-        for i in 'HELLO':
-            self.assertEqual((yield dut.stream.payload), ord(i))
-            yield
-
+        # ... we should start seeing the remainder of our transmission;
+        # capture the whole run and compare it in one vectorized sweep.
+        traces = yield from self.capture(dict(payload=dut.stream.payload), 5)
+        self.assertTrue(np.array_equal(traces['payload'], [ord(i) for i in 'HELLO']))
 
         # On the last byte of data, we should see last = 1.
         self.assertEqual((yield dut.stream.last),   1)
@@ -638,7 +660,11 @@ class StreamSerializer(Elaboratable):
         m.d.comb += [
             # Create first and last based on our stream position.
             self.stream.first    .eq(on_first_packet & self.stream.valid),
-            self.stream.last     .eq(on_last_packet  & self.stream.valid)
+            self.stream.last     .eq(on_last_packet  & self.stream.valid),
+
+            # Report our completion as the last beat is accepted, rather than
+            # spending a dedicated FSM state on it.
+            self.done            .eq(on_last_packet & self.stream.valid & self.stream.ready)
         ]
 
         #
@@ -675,12 +701,7 @@ class StreamSerializer(Elaboratable):
 
                     # Otherwise, we've finished streaming. Return to IDLE.
                     with m.Else():
-                        m.next = 'DONE'
-
-            # DONE -- report our completion; and then return to idle
-            with m.State('DONE'):
-                m.d.comb += self.done.eq(1)
-                m.next = 'IDLE'
+                        m.next = 'IDLE'
 
         # Convert our sync domain to the domain requested by the user, if necessary.
         if self.domain != "sync":
@@ -716,6 +737,18 @@ class PacketListStreamer(Elaboratable):
         self.done       = Signal()
         self.packets    = packets
 
+        # Flatten the packet list once, up front, into structure-of-arrays form:
+        # one contiguous payload buffer plus one array of per-packet lengths.
+        # Byte packets collapse into a single `bytes` object -- one machine byte
+        # per payload byte, instead of one boxed Python int each -- which the
+        # generator accepts directly as its ROM initializer.
+        self._packet_lengths = np.fromiter((len(p) for p in packets), dtype=np.int32)
+        if all(isinstance(p, (bytes, bytearray)) for p in packets):
+            self._packets_flattened = b"".join(bytes(p) for p in packets)
+        else:
+            self._packets_flattened = np.concatenate(
+                [np.asarray(p) for p in packets])
+
         # If we have a data width, apply it to our stream type; otherwise, use its defaults.
         if data_width:
             self.stream  = stream_type(payload_width=data_width)
@@ -726,31 +759,57 @@ class PacketListStreamer(Elaboratable):
 
     def elaborate(self, platform) -> Module:
         m = Module()
-        packet_lengths = [len(p) for p in self.packets]
+        packet_lengths = self._packet_lengths
         no_packets = len(packet_lengths)
 
-        max_length_width = bits_for(max(packet_lengths))
-        packets_flattened = [words for packet in self.packets for words in packet]
+        max_length_width = bits_for(int(packet_lengths.max()))
+        packets_flattened = self._packets_flattened
+
+        # A single packet degenerates to a bare ConstantStreamGenerator:
+        # no length ROM, no packet counter, no sequencing FSM.
+        if no_packets == 1:
+            m.submodules.generator = generator = \
+                ConstantStreamGenerator(packets_flattened)
+
+            m.d.comb += [
+                self.stream.stream_eq(generator.stream),
+                generator.start.eq(self.start),
+                self.done.eq(generator.done),
+            ]
+
+            return m
 
         m.submodules.generator = generator = \
             ConstantStreamGenerator(packets_flattened, max_length_width=max_length_width)
 
-        rom = Memory(width=max_length_width, depth=no_packets, init=packet_lengths)
-        m.submodules.packet_lengths_rom = packet_lengths_rom = rom.read_port(transparent=False)
-
         total_no_bytes = len(packets_flattened)
 
-        position           = Signal(range(total_no_bytes))
-        next_position      = Signal.like(position)
-        current_packet     = Signal(range(no_packets))
-        current_packet_len = Signal(max_length_width)
+        position            = Signal(range(total_no_bytes))
+        next_position       = Signal.like(position)
+        current_packet      = Signal(range(no_packets))
+        next_current_packet = Signal.like(current_packet)
+
+        # The length of the packet currently being streamed is held in a
+        # register; the length table is free to pre-fetch the *next*
+        # packet's length while the generator is busy, so the length is
+        # already available on the cycle `generator.done` fires.
+        current_packet_len  = Signal(max_length_width)
+
+        if no_packets == 2:
+            # a two-entry length table is a single mux; no BRAM needed
+            lengths = Array(Const(int(length), max_length_width) for length in packet_lengths)
+            next_packet_length = lengths[next_current_packet]
+        else:
+            rom = Memory(width=max_length_width, depth=no_packets, init=packet_lengths)
+            m.submodules.packet_lengths_rom = packet_lengths_rom = rom.read_port(transparent=False)
+            m.d.comb += packet_lengths_rom.addr.eq(next_current_packet)
+            next_packet_length = packet_lengths_rom.data
 
         m.d.comb += [
             self.stream.stream_eq(generator.stream),
             generator.start.eq(0),
             generator.start_position.eq(position),
-            packet_lengths_rom.addr.eq(current_packet),
-            current_packet_len.eq(packet_lengths_rom.data),
+            next_current_packet.eq(current_packet + 1),
             generator.max_length.eq(current_packet_len),
             next_position.eq(position + current_packet_len),
             self.done.eq(0)
@@ -758,8 +817,19 @@ class PacketListStreamer(Elaboratable):
 
         with m.FSM():
             with m.State("INIT"):
+                # while idle, keep the first packet's length on the ROM output
+                m.d.comb += next_current_packet.eq(current_packet)
                 with m.If(self.start):
-                    m.d.comb += generator.start.eq(1)
+                    m.d.comb += [
+                        generator.start.eq(1),
+                        generator.max_length.eq(next_packet_length),
+                    ]
+                    if no_packets != 2:
+                        # pre-fetch the following packet's length; the mux of
+                        # the two-packet case answers combinationally, so it
+                        # must keep pointing at the current packet here
+                        m.d.comb += next_current_packet.eq(current_packet + 1)
+                    m.d.sync += current_packet_len.eq(next_packet_length)
                     m.next = "WAIT"
 
             with m.State("SEND"):
@@ -779,6 +849,7 @@ class PacketListStreamer(Elaboratable):
                         m.d.sync += [
                             position.eq(next_position),
                             current_packet.eq(current_packet + 1),
+                            current_packet_len.eq(next_packet_length),
                         ]
                         m.next = "SEND"
 
@@ -801,8 +872,6 @@ class PacketListStreamerTest(GatewareTestCase):
     def wait_for_next_packet(self):
         yield
         self.assertEqual((yield self.dut.stream.valid), 0)
-        yield
-        self.assertEqual((yield self.dut.stream.valid), 0)
 
     @sync_test_case
     def test_basic_transmission(self):
@@ -843,7 +912,7 @@ class PacketListStreamerTest(GatewareTestCase):
         self.assertEqual((yield dut.stream.first),   0)
         self.assertEqual((yield dut.stream.last),    1)
 
-        # first packet done, takes two cycles to load the next
+        # first packet done, takes one cycle to load the next
         yield from self.wait_for_next_packet()
 
         # If we drop the 'accepted', we should still see the next byte...
@@ -870,7 +939,7 @@ class PacketListStreamerTest(GatewareTestCase):
                 self.assertEqual((yield dut.stream.first), 0)
                 self.assertEqual((yield dut.stream.last),  1)
 
-        # two cycles to load the next packet
+        # one cycle to load the next packet
         yield from self.wait_for_next_packet()
 
         # the third packet contains a single space, so it should
@@ -880,7 +949,7 @@ class PacketListStreamerTest(GatewareTestCase):
         self.assertEqual((yield dut.stream.first), 1)
         self.assertEqual((yield dut.stream.last),  1)
 
-        # two cycles to load the next packet
+        # one cycle to load the next packet
         yield from self.wait_for_next_packet()
 
         # now we should see the fourth packet
@@ -895,7 +964,7 @@ class PacketListStreamerTest(GatewareTestCase):
                 self.assertEqual((yield dut.stream.last),  1)
 
 
-        # two cycles to load the next packet
+        # one cycle to load the next packet
         yield from self.wait_for_next_packet()
 
         # the fifth packet contains a single dash, so it should
@@ -905,24 +974,26 @@ class PacketListStreamerTest(GatewareTestCase):
         self.assertEqual((yield dut.stream.first), 1)
         self.assertEqual((yield dut.stream.last),  1)
 
-        # two cycles to load the next packet
+        # one cycle to load the next packet
         yield from self.wait_for_next_packet()
 
-        # now we should see the sixth packet
-        for i in 'users!':
-            yield
-            self.assertEqual((yield dut.stream.payload), ord(i))
-            if i == 'u':
-                self.assertEqual((yield dut.stream.first), 1)
-                self.assertEqual((yield dut.stream.last),  0)
-            if i == '!':
-                self.assertEqual((yield dut.stream.first), 0)
-                self.assertEqual((yield dut.stream.last),  1)
-
-        # After the last datum, we should see valid drop to '0'.
+        # now we should see the sixth packet; capture its whole waveform
+        # and compare the traces in one vectorized sweep
         yield
+        traces = yield from self.capture(dict(
+            payload = dut.stream.payload,
+            first   = dut.stream.first,
+            last    = dut.stream.last,
+            done    = dut.done), 6)
+        self.assertTrue(np.array_equal(traces['payload'], [ord(i) for i in 'users!']))
+        self.assertTrue(np.array_equal(traces['first'],   [1, 0, 0, 0, 0, 0]))
+        self.assertTrue(np.array_equal(traces['last'],    [0, 0, 0, 0, 0, 1]))
+
+        # The 'done' strobe should accompany the last accepted byte...
+        self.assertTrue(np.array_equal(traces['done'],    [0, 0, 0, 0, 0, 1]))
+
+        # ... and after the last datum, we should see valid drop to '0'.
         self.assertEqual((yield dut.stream.valid), 0)
-        self.assertEqual((yield dut.done),         1)
         yield from self.pulse(dut.start)
         self.assertEqual((yield dut.stream.valid),   1)
         self.assertEqual((yield dut.stream.payload), ord('H'))
@@ -5,7 +5,7 @@
 
 from amaranth import *
 from amaranth.build import Platform
-from amaranth.lib.fifo import SyncFIFO
+from amaranth.lib.fifo import SyncFIFOBuffered
 
 from . import StreamInterface
 from . import connect_stream_to_fifo
@@ -26,7 +26,10 @@ class I2CStreamTransmitter(Elaboratable):
     def elaborate(self, platform: Platform) -> Module:
         m = Module()
         m.submodules.i2c = i2c = self.i2c
-        m.submodules.input_fifo = in_fifo = SyncFIFO(width=8 + 2, depth=self._fifo_depth)
+        # buffered FIFO: r_data (and with it the first/last flags below)
+        # comes from the output register instead of the storage mux, so the
+        # flags don't sit on the I2C FSM's next-state path
+        m.submodules.input_fifo = in_fifo = SyncFIFOBuffered(width=8 + 2, depth=self._fifo_depth)
         m.d.comb += [
             connect_stream_to_fifo(self.stream_in, in_fifo),
             in_fifo.w_data[8].eq(self.stream_in.first),
@@ -6,6 +6,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import functools
+import os
 
 from amaranth import Elaboratable
 from amaranth.sim import Simulator
@@ -25,13 +26,20 @@ def simulation_test(case=None, **kwargs):
                 if hasattr(self, "simulationSetUp"):
                     yield from self.simulationSetUp(self.tb)
                 yield from case(self, self.tb)
+            # tracing every signal dominates pysim runtime, so only write
+            # VCDs when asked for, like the GatewareTestCase harness does
+            generate_vcds = os.getenv('GENERATE_VCDS', default=False)
             if isinstance(self.tb, CompatModule):
-                compat_run_simulation(self.tb, setup_wrapper(), vcd_name="test.vcd")
+                compat_run_simulation(self.tb, setup_wrapper(),
+                                      vcd_name="test.vcd" if generate_vcds else None)
             if isinstance(self.tb, Elaboratable):
                 sim = Simulator(self.tb)
-                with sim.write_vcd(vcd_file=open("test.vcd", "w")):
-                    sim.add_clock(1e-8)
-                    sim.add_sync_process(setup_wrapper)
+                sim.add_clock(1e-8)
+                sim.add_sync_process(setup_wrapper)
+                if generate_vcds:
+                    with sim.write_vcd(vcd_file=open("test.vcd", "w")):
+                        sim.run()
+                else:
                     sim.run()
         return wrapper
 
@@ -11,6 +11,8 @@ import os
 import math
 import unittest
 
+import numpy as np
+
 from functools import wraps
 
 from amaranth     import Signal
@@ -127,6 +129,23 @@ class GatewareTestCase(unittest.TestCase):
         for _ in range(cycles):
             yield
 
+    @staticmethod
+    def capture(signals, cycles):
+        """ Helper method that advances a given number of cycles, recording signals.
+
+            Returns one NumPy trace per entry of the `signals` dict, keyed alike,
+            so a test can check a whole waveform with a single vectorized
+            comparison instead of an assertEqual per simulated cycle.
+        """
+        traces = {name: np.empty(cycles, dtype=np.int64) for name in signals}
+
+        for cycle in range(cycles):
+            for name, signal in signals.items():
+                traces[name][cycle] = yield signal
+            yield
+
+        return traces
+
     @staticmethod
     def wait_until(strobe, *, timeout=None):
         """ Helper method that advances time until a strobe signal becomes true. """
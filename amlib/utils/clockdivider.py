@@ -17,15 +17,16 @@ class SimpleClockDivider(Elaboratable):
 
         clock_counter = Signal(range(self._divisor))
 
-        with m.If(clock_counter >= (self._divisor - 1)):
+        # the counter never exceeds the terminal count, so an equality
+        # test replaces the magnitude compare
+        terminal_count = Signal()
+        m.d.comb += terminal_count.eq(clock_counter == self._divisor - 1)
+        m.d.sync += clock_counter.eq(Mux(terminal_count, 0, clock_counter + 1))
+
+        with m.If(terminal_count):
             with m.If(self.clock_enable_in):
-                m.d.sync += self.clock_out.eq(~self.clock_out),
+                m.d.sync += self.clock_out.eq(~self.clock_out)
             with m.Else():
                 m.d.sync += self.clock_out.eq(self.clock_polarity)
 
-            m.d.sync += clock_counter.eq(0)
-
-        with m.Else():
-            m.d.sync += clock_counter.eq(clock_counter + 1)
-
         return m
\ No newline at end of file
@@ -4,6 +4,8 @@
 # SPDX-License-Identifier: CERN-OHL-W-2.0
 #
 """Counter which runs a subcounter which divides the maincounter"""
+import numpy as np
+
 from amaranth import Elaboratable, Signal, Module
 from ..test import GatewareTestCase, sync_test_case
 
@@ -25,19 +27,51 @@ class DividingCounter(Elaboratable):
         """build the module"""
         m = Module()
 
-        dividing_cycle_counter = Signal(range(0, self.divisor))
+        # one widened increment serves both the main counter and, through
+        # its carry-out, the wrap detect that used to be an equality
+        # compare against all-ones
+        counter_next = Signal(self.width + 1)
+        m.d.comb += counter_next.eq(self.counter_out + 1)
+
+        if self.divisor & (self.divisor - 1) == 0:
+            # power-of-two divisor: the low bits of the main counter carry
+            # the sub-count already, so the sub-counter and its terminal
+            # test reduce to a zero flag on the low bits of the next count.
+            # The divided counter keeps its own register: it counts pulses
+            # modulo 2**width and must not wrap with the main counter.
+            log2_divisor = self.divisor.bit_length() - 1
+            dividable_next = counter_next[:log2_divisor] == 0
+
+            with m.If(self.reset_in):
+                m.d.sync += [
+                    self.counter_out.eq(0),
+                    self.divided_counter_out.eq(0)
+                ]
+            with m.Elif(self.active_in):
+                m.d.sync += [
+                    self.counter_out.eq(counter_next),
+                    self.dividable_out.eq(dividable_next)
+                ]
+                with m.If(dividable_next):
+                    m.d.sync += self.divided_counter_out.eq(self.divided_counter_out + 1)
+
+            return m
+
+        # the dividing counter counts down so its terminal test is a zero
+        # flag instead of a magnitude compare against divisor - 1
+        dividing_cycle_counter = Signal(range(0, self.divisor), reset=self.divisor - 1)
 
         with m.If(self.reset_in):
             m.d.sync += [
                 self.counter_out.eq(0),
                 self.divided_counter_out.eq(0),
-                dividing_cycle_counter.eq(0)
+                dividing_cycle_counter.eq(self.divisor - 1)
             ]
         with m.Else():
             with m.If(self.active_in):
-                with m.If(dividing_cycle_counter == self.divisor - 1):
+                with m.If(dividing_cycle_counter == 0):
                     m.d.sync += [
-                        dividing_cycle_counter.eq(0),
+                        dividing_cycle_counter.eq(self.divisor - 1),
                         self.divided_counter_out.eq(self.divided_counter_out + 1),
                         self.dividable_out.eq(1)
                     ]
@@ -45,15 +79,15 @@ class DividingCounter(Elaboratable):
                 with m.Else():
                     m.d.sync += [
                         self.dividable_out.eq(0),
-                        dividing_cycle_counter.eq(dividing_cycle_counter + 1)
+                        dividing_cycle_counter.eq(dividing_cycle_counter - 1)
                     ]
 
                 # when the main counter wraps around to zero, the dividing counter needs reset too
-                with m.If(self.counter_out == (2 ** self.counter_out.width) - 1):
-                    m.d.sync += dividing_cycle_counter.eq(0)
+                with m.If(counter_next[self.width]):
+                    m.d.sync += dividing_cycle_counter.eq(self.divisor - 1)
 
                 m.d.sync += [
-                    self.counter_out.eq(self.counter_out + 1),
+                    self.counter_out.eq(counter_next),
                 ]
 
         return m
@@ -71,20 +105,20 @@ class DividingCounterTest(GatewareTestCase):
             yield
             self.assertEqual((yield dut.counter_out), 0)
 
-        count = 0
-        divided_count = 1
+        # record the whole run in one pass and assert on the numpy traces,
+        # instead of a handful of pysim signal reads per simulated cycle
         yield dut.active_in.eq(1)
-        for _ in range(0, 50):
-            yield
-            self.assertEqual((yield dut.counter_out), count % 32)
-
-            dividable = yield dut.dividable_out
-            if dividable:
-                self.assertEqual(((count % 32) % 5), 0)
-                self.assertEqual((yield dut.divided_counter_out), divided_count)
-                divided_count += 1
+        yield
+        traces = yield from self.capture({
+            'counter':   dut.counter_out,
+            'dividable': dut.dividable_out,
+            'divided':   dut.divided_counter_out,
+        }, 50)
 
-            count += 1
+        self.assertTrue((traces['counter'] == np.arange(50) % 32).all())
+        pulses = traces['dividable'].astype(bool)
+        self.assertTrue((traces['counter'][pulses] % 5 == 0).all())
+        self.assertTrue((traces['divided'][pulses] == np.arange(1, pulses.sum() + 1)).all())
 
         yield dut.reset_in.eq(1)
         yield
@@ -97,11 +131,9 @@ class DividingCounterTest(GatewareTestCase):
         yield
         yield dut.reset_in.eq(0)
 
-        count = 0
-        for _ in range(0, 20):
-            yield
-            self.assertEqual((yield dut.counter_out), count % 32)
-            count += 1
+        yield
+        traces = yield from self.capture({'counter': dut.counter_out}, 20)
+        self.assertTrue((traces['counter'] == np.arange(20) % 32).all())
 
         yield dut.active_in.eq(0)
         yield
@@ -5,7 +5,7 @@
 #
 """Encode a stream of bits to NRZI"""
 
-from amaranth import Elaboratable, Signal, Module, Mux
+from amaranth import Elaboratable, Signal, Module
 
 class NRZIEncoder(Elaboratable):
     """Converts a synchronous stream of bits into a NRZI encoded stream"""
@@ -18,9 +18,8 @@ class NRZIEncoder(Elaboratable):
         """ build the module """
         m = Module()
 
-        m.d.sync += self.nrzi_out.eq(
-                        Mux(self.data_in,
-                            ~self.nrzi_out,
-                            self.nrzi_out)),
+        # a one toggles the output, a zero holds it: that is just an XOR,
+        # which needs one LUT input less than the equivalent 2:1 mux
+        m.d.sync += self.nrzi_out.eq(self.nrzi_out ^ self.data_in)
 
         return m
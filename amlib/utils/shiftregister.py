@@ -7,7 +7,7 @@
     synchronous shift register: bits appear in the output at the next
                                 clock cycle
 """
-from amaranth import Elaboratable, Signal, Module, Cat
+from amaranth import Elaboratable, Signal, Module, Mux
 from ..test     import GatewareTestCase, sync_test_case
 
 # pylint: disable=too-few-public-methods
@@ -45,12 +45,39 @@ class OutputShiftRegister(Elaboratable):
         m = Module()
 
         value = Signal.like(self.value_in)
-        m.d.comb += self.bit_out.eq(value[0])
 
-        with m.If(self.we_in):
-            m.d.sync += value.eq(self.value_in)
-        with m.Elif(self.enable_in):
-            m.d.sync += value.eq(Cat(value[1:], value[0])) if self.rotate else value.eq((value >> 1))
+        if self.rotate:
+            # the value register stays put here too: a wrapping index
+            # re-reads the bits in a circle, so the flops only toggle on
+            # load instead of all rotating every enabled cycle
+            depth = len(self.value_in)
+            index = Signal(range(depth))
+            m.d.comb += self.bit_out.eq(value.bit_select(index, 1))
+
+            with m.If(self.we_in):
+                m.d.sync += [
+                    value.eq(self.value_in),
+                    index.eq(0),
+                ]
+            with m.Elif(self.enable_in):
+                m.d.sync += index.eq(Mux(index == depth - 1, 0, index + 1))
+        else:
+            # without rotation the value register can stay put: an index
+            # walks the bits through a read mux instead of the whole
+            # register shifting every enabled cycle, and saturates one
+            # past the end where the shifted-out register read all zeroes
+            depth    = len(self.value_in)
+            index    = Signal(range(depth + 1))
+            past_end = index == depth
+            m.d.comb += self.bit_out.eq(Mux(past_end, 0, value.bit_select(index, 1)))
+
+            with m.If(self.we_in):
+                m.d.sync += [
+                    value.eq(self.value_in),
+                    index.eq(0),
+                ]
+            with m.Elif(self.enable_in & ~past_end):
+                m.d.sync += index.eq(index + 1)
 
         return m
 
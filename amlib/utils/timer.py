@@ -3,12 +3,15 @@ from amaranth.build import Platform
 from ..test       import GatewareTestCase, sync_test_case
 
 class Timer(Elaboratable):
-    def __init__(self, *, width=32, load=None, reload=None, allow_restart=True):
+    def __init__(self, *, width=32, load=None, reload=None, allow_restart=True, use_dsp=False):
         self._width = width
         self._allow_restart = allow_restart
         self.load_in     = Signal(width, name="load")   if load   == None else load
         self.reload_in   = Signal(width, name="reload") if reload == None else reload
-        self.counter_out = Signal(width)
+        # use_dsp asks the toolchain to absorb the wide counter into a DSP
+        # slice, whose dedicated carry path beats the fabric chain for
+        # large widths; tools without the attribute simply ignore it
+        self.counter_out = Signal(width, attrs={"use_dsp": "yes"} if use_dsp else {})
         self.start       = Signal()
         self.done        = Signal()
 
@@ -17,15 +20,40 @@ class Timer(Elaboratable):
 
         counter = self.counter_out
 
+        # load/reload given as plain ints or Consts are known here, so the
+        # decision trees guarded by them can be resolved in Python instead
+        # of emitting magnitude comparators into the netlist
+        def as_const(value):
+            if isinstance(value, int):
+                return value
+            if isinstance(value, Const):
+                return value.value
+            return None
+
+        load_const   = as_const(self.load_in)
+        reload_const = as_const(self.reload_in)
+
+        # reload - 1 is only consumed at the period boundary: fold it to a
+        # constant when reload is fixed, otherwise keep it in a register so
+        # the subtractor sits off the DONE transition path
+        if reload_const is not None:
+            reload_minus_one = Const(reload_const - 1, self._width)
+        else:
+            reload_minus_one = Signal(self._width)
+            m.d.sync += reload_minus_one.eq(self.reload_in - 1)
+
         with m.FSM() as fsm:
             m.d.comb += self.done.eq(fsm.ongoing("DONE"))
 
             with m.State("IDLE"):
                 # if load is nonzero, it takes precedence
-                with m.If(self.load_in > 0):
-                    m.d.sync += counter.eq(self.load_in)
-                with m.Else():
-                    m.d.sync += counter.eq(self.reload_in)
+                if load_const is not None:
+                    m.d.sync += counter.eq(self.load_in if load_const > 0 else self.reload_in)
+                else:
+                    with m.If(self.load_in > 0):
+                        m.d.sync += counter.eq(self.load_in)
+                    with m.Else():
+                        m.d.sync += counter.eq(self.reload_in)
 
                 with m.If(self.start & (counter > 0)):
                     # done should appear exactly 'load' cycles
@@ -39,14 +67,23 @@ class Timer(Elaboratable):
                     m.next = "DONE"
 
             with m.State("DONE"):
-                with m.If(self.reload_in > 0):
-                    # we want the next done to appear
-                    # exactly 'reload_in' cycles later
-                    m.d.sync += counter.eq(self.reload_in - 1)
-                    m.next = "RUNNING"
-                if self._allow_restart:
-                    with m.Else():
+                if reload_const is not None:
+                    if reload_const > 0:
+                        # we want the next done to appear
+                        # exactly 'reload_in' cycles later
+                        m.d.sync += counter.eq(reload_minus_one)
+                        m.next = "RUNNING"
+                    elif self._allow_restart:
                         m.next = "IDLE"
+                else:
+                    with m.If(self.reload_in > 0):
+                        # we want the next done to appear
+                        # exactly 'reload_in' cycles later
+                        m.d.sync += counter.eq(reload_minus_one)
+                        m.next = "RUNNING"
+                    if self._allow_restart:
+                        with m.Else():
+                            m.next = "IDLE"
 
         return m
 
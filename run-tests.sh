@@ -19,6 +19,7 @@ python3 -m unittest amlib.dsp.fixedpointiirfilter.FixedPointIIRFilterTest
 python3 -m unittest amlib.dsp.fixedpointhbfilter.FixedPointHBFilterTest
 python3 -m unittest amlib.dsp.fixedpointcicfilter.FixedPointCICFilterTest
 python3 -m unittest amlib.dsp.fixedpointfft.FixedPointFFTTest
+python3 -m unittest amlib.dsp.polyphasefir.PolyphaseFIRFilterTest
 python3 -m unittest amlib.dsp.resampler.ResamplerTestFIR
 python3 -m unittest amlib.dsp.resampler.ResamplerTestIIR
 
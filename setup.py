@@ -1,18 +1,18 @@
 from setuptools import setup, find_packages
 
 
-def scm_version():
-    def local_scheme(version):
-        return version.format_choice("+{node}", "+{node}.dirty")
-    return {
-        "relative_to": __file__,
-        "version_scheme": "guess-next-dev",
-        "local_scheme": local_scheme,
-    }
+def _local_scheme(version):
+    return version.format_choice("+{node}", "+{node}.dirty")
+
+SCM_VERSION_CONFIG = {
+    "relative_to": __file__,
+    "version_scheme": "guess-next-dev",
+    "local_scheme": _local_scheme,
+}
 
 setup(
     name="amlib",
-    use_scm_version=scm_version(),
+    use_scm_version=SCM_VERSION_CONFIG,
     author="Hans Baier",
     author_email="hansfbaier@gmail.com",
     description="library of utility cores for amaranth HDL",